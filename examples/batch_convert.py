@@ -6,14 +6,28 @@
 import os
 import sys
 from pathlib import Path
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Optional
 import argparse
 import logging
 
 # 添加项目路径
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from src.main import main as ppt_converter_main
+from src.main import run as convert_ppt
+
+
+@dataclass(frozen=True)
+class ConvertArgs:
+    """单个文件的转换参数（模块级定义，可pickle后传给子进程）"""
+    format: str
+    ai: str
+    model: str
+    api_key: Optional[str]
+    base_url: Optional[str]
+    ocr: bool
+    verbose: bool
 
 
 def setup_logging(verbose=False):
@@ -26,55 +40,85 @@ def setup_logging(verbose=False):
 
 
 def convert_single_file(ppt_path, args):
-    """转换单个文件"""
+    """
+    转换单个文件（在独立进程中执行）
+    
+    Args:
+        ppt_path: PPT文件路径
+        args: 转换参数
+    """
     logger = logging.getLogger(__name__)
     
     try:
         logger.info(f"开始转换: {ppt_path}")
         
-        # 构建命令行参数
-        cmd_args = [
-            'ppt-converter',
+        success = convert_ppt(
             str(ppt_path),
-            '--format', args.format,
-            '--ai', args.ai,
-            '--model', args.model
-        ]
-        
-        if args.api_key:
-            cmd_args.extend(['--api-key', args.api_key])
+            format=args.format,
+            ai=args.ai,
+            model=args.model,
+            api_key=args.api_key,
+            base_url=args.base_url,
+            ocr=args.ocr,
+            verbose=args.verbose
+        )
         
-        if args.base_url:
-            cmd_args.extend(['--base-url', args.base_url])
+        if not success:
+            return False, ppt_path, "转换失败，详见日志"
         
-        if args.ocr:
-            cmd_args.append('--ocr')
-        
-        if args.verbose:
-            cmd_args.append('--verbose')
-        
-        # 保存原始sys.argv
-        original_argv = sys.argv.copy()
-        
-        try:
-            # 设置新的sys.argv
-            sys.argv = cmd_args
-            
-            # 执行转换
-            ppt_converter_main()
-            
-            logger.info(f"转换成功: {ppt_path}")
-            return True, ppt_path, None
-            
-        finally:
-            # 恢复sys.argv
-            sys.argv = original_argv
+        logger.info(f"转换成功: {ppt_path}")
+        return True, ppt_path, None
             
     except Exception as e:
         logger.error(f"转换失败 {ppt_path}: {e}")
         return False, ppt_path, str(e)
 
 
+def find_ppt_files(input_path):
+    """
+    查找目录下的所有PPT文件
+    
+    只遍历一次目录树；在支持os.fwalk的平台上基于目录文件描述符stat，
+    并按文件大小降序返回，让最耗时的文件最先开始处理。
+    
+    Args:
+        input_path: 输入目录
+        
+    Returns:
+        PPT文件路径列表
+    """
+    logger = logging.getLogger(__name__)
+    ppt_extensions = ('.ppt', '.pptx')
+    sized_files = []
+    
+    # 符号链接按目标文件的大小排序；遍历期间被删除或无法访问的文件直接跳过
+    if hasattr(os, 'fwalk'):
+        for root, dirs, files, root_fd in os.fwalk(input_path):
+            for name in files:
+                if name.lower().endswith(ppt_extensions):
+                    try:
+                        size = os.stat(name, dir_fd=root_fd, follow_symlinks=True).st_size
+                    except OSError as e:
+                        logger.warning(f"跳过无法访问的文件 {Path(root) / name}: {e}")
+                        continue
+                    sized_files.append((size, Path(root) / name))
+    else:
+        # Windows等平台没有os.fwalk
+        for root, dirs, files in os.walk(input_path):
+            for name in files:
+                if name.lower().endswith(ppt_extensions):
+                    path = Path(root) / name
+                    try:
+                        size = path.stat().st_size
+                    except OSError as e:
+                        logger.warning(f"跳过无法访问的文件 {path}: {e}")
+                        continue
+                    sized_files.append((size, path))
+    
+    sized_files.sort(key=lambda item: item[0], reverse=True)
+    return [path for _, path in sized_files]
+
+
 def batch_convert(input_dir, output_format='docx', ai_service='ollama', model='llama2',
                  api_key=None, base_url=None, enable_ocr=False, max_workers=4, verbose=False):
     """
@@ -100,12 +144,7 @@ def batch_convert(input_dir, output_format='docx', ai_service='ollama', model='l
         return
     
     # 查找PPT文件
-    ppt_extensions = ['.ppt', '.pptx']
-    ppt_files = []
-    
-    for ext in ppt_extensions:
-        ppt_files.extend(input_path.rglob(f'*{ext}'))
-        ppt_files.extend(input_path.rglob(f'*{ext.upper()}'))
+    ppt_files = find_ppt_files(input_path)
     
     if not ppt_files:
         logger.warning(f"在目录中未找到PPT文件: {input_path}")
@@ -114,23 +153,21 @@ def batch_convert(input_dir, output_format='docx', ai_service='ollama', model='l
     logger.info(f"找到 {len(ppt_files)} 个PPT文件")
     
     # 创建参数对象
-    class Args:
-        def __init__(self):
-            self.format = output_format
-            self.ai = ai_service
-            self.model = model
-            self.api_key = api_key
-            self.base_url = base_url
-            self.ocr = enable_ocr
-            self.verbose = verbose
-    
-    args = Args()
+    args = ConvertArgs(
+        format=output_format,
+        ai=ai_service,
+        model=model,
+        api_key=api_key,
+        base_url=base_url,
+        ocr=enable_ocr,
+        verbose=verbose
+    )
     
     # 批量转换
     success_count = 0
     failure_count = 0
     
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
         # 提交所有任务
         future_to_file = {
             executor.submit(convert_single_file, ppt_file, args): ppt_file 
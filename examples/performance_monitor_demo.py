@@ -1,6 +1,7 @@
 """
 性能监控工具使用示例
 """
+import hashlib
 from pathlib import Path
 from src.performance_utils import monitor_performance, PerformanceMonitor, get_system_stats
 from src.logging_config import get_logger
@@ -11,10 +12,15 @@ logger = get_logger(__name__)
 def process_large_file(file_path: Path):
     """模拟处理大文件的操作"""
     logger.info(f"开始处理文件: {file_path}")
-    # 模拟耗时操作
-    data = b" " * 1024 * 1024 * 100  # 100MB数据
-    processed = data.upper()
-    return len(processed)
+    # 模拟耗时操作：按1MB分块计算100MB数据的哈希，不产生额外副本
+    data = bytearray(100 * 1024 * 1024)  # 100MB数据
+    view = memoryview(data)
+    chunk_size = 1024 * 1024
+    digest = hashlib.sha256()
+    for offset in range(0, len(view), chunk_size):
+        digest.update(view[offset:offset + chunk_size])
+    logger.info(f"数据摘要: {digest.hexdigest()[:16]}")
+    return len(data)
 
 def main():
     """主函数"""
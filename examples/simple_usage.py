@@ -10,7 +10,7 @@ from pathlib import Path
 # 添加项目路径
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from src.main import main as ppt_converter_main
+from src.main import run as convert_ppt
 
 
 def create_sample_ppt():
@@ -147,31 +147,24 @@ def demo_basic_conversion():
     if not sample_ppt:
         return
     
-    # 保存原始sys.argv
-    original_argv = sys.argv.copy()
-    
     try:
         # 演示1: 基本转换 (Docx)
         print("\n1. 转换为Docx格式...")
-        sys.argv = ['ppt-converter', str(sample_ppt), '--format', 'docx', '--verbose']
-        ppt_converter_main()
+        convert_ppt(str(sample_ppt), format='docx', verbose=True)
         
         # 演示2: 转换为Markdown
         print("\n2. 转换为Markdown格式...")
-        sys.argv = ['ppt-converter', str(sample_ppt), '--format', 'markdown', '--verbose']
-        ppt_converter_main()
+        convert_ppt(str(sample_ppt), format='markdown', verbose=True)
         
         # 演示3: 启用OCR
         print("\n3. 启用OCR处理...")
-        sys.argv = ['ppt-converter', str(sample_ppt), '--ocr', '--verbose']
-        ppt_converter_main()
+        convert_ppt(str(sample_ppt), ocr=True, verbose=True)
         
         # 演示4: 使用OpenAI (如果配置了API密钥)
         api_key = os.getenv("API_KEY")
         if api_key:
             print("\n4. 使用OpenAI...")
-            sys.argv = ['ppt-converter', str(sample_ppt), '--ai', 'openai', '--api-key', api_key, '--verbose']
-            ppt_converter_main()
+            convert_ppt(str(sample_ppt), ai='openai', api_key=api_key, verbose=True)
         else:
             print("\n4. 跳过OpenAI演示 (未设置API_KEY环境变量)")
         
@@ -184,10 +177,6 @@ def demo_basic_conversion():
         
     except Exception as e:
         print(f"演示过程中发生错误: {e}")
-    
-    finally:
-        # 恢复sys.argv
-        sys.argv = original_argv
 
 
 def demo_command_line():
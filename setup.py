@@ -52,6 +52,7 @@ setup(
         "dev": [
             "pytest>=7.4.0",
             "pytest-cov>=4.1.0",
+            "pytest-xdist>=3.3.0",
             "black>=23.7.0",
             "flake8>=6.0.0",
             "mypy>=1.5.0",
@@ -59,9 +60,20 @@ setup(
         "windows": [
             "comtypes>=1.2.0",
         ],
+        "tesserocr": [
+            "tesserocr>=2.6.0",
+        ],
+        "easyocr": [
+            "easyocr>=1.7.0",
+        ],
         "pdf": [
             "pdf2image>=1.16.3",
         ],
+        "fast": [
+            "orjson>=3.8.0",
+            "ijson>=3.2.0",
+            "python-rapidjson>=1.9",
+        ],
     },
     entry_points={
         "console_scripts": [
@@ -5,18 +5,112 @@ AI处理器模块
 
 import logging
 import json
-from typing import Dict, List, Any, Optional
+import os
+import re
+import hashlib
+import tempfile
+import threading
+import time
+from functools import lru_cache
+from email.utils import parsedate_to_datetime
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Callable, Dict, List, Any, Optional, Set
 from dataclasses import dataclass
 
+from .config import CACHE_MODES
 from .logging_config import get_logger
 
 try:
     import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
 except ImportError:
     get_logger(__name__).warning("requests库未安装，API功能将受限")
 
+# orjson为可选依赖（pip install .[fast]），未安装时回退到标准库json
+try:
+    import orjson
+    _loads = orjson.loads
+    _dumps = orjson.dumps
+except ImportError:
+    _loads = json.loads
+    
+    def _dumps(obj: Any) -> bytes:
+        # 中文直接按UTF-8发送，避免\uXXXX转义使请求体膨胀
+        return json.dumps(obj, ensure_ascii=False).encode("utf-8")
+
+# ijson为可选依赖，用于流式解析超长响应
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
 logger = get_logger(__name__)
 
+# 进程内响应缓存的最大条目数
+_MEMORY_CACHE_SIZE = 256
+
+# 解析失败时在metadata中保留的响应长度
+_RESPONSE_HEAD_SIZE = 512
+
+# 超过该长度的响应使用ijson流式解析，更短时ijson的开销大于收益
+_STREAM_PARSE_THRESHOLD = 4096
+
+# 流式解析时提取的字段
+_SCALAR_FIELDS = frozenset({"content", "summary"})
+_LIST_FIELDS = frozenset({"key_points", "tags"})
+
+# OpenAI请求超时: (连接, 读取)，连接失败快速失败，由适配器层重试
+_OPENAI_TIMEOUT = (3.05, 30)
+
+# 限流(429)后暂停后续调用的时间上限（秒），以及未给出Retry-After时的默认值
+_MAX_RETRY_AFTER = 60.0
+_DEFAULT_RETRY_AFTER = 1.0
+
+# 已验证可用的Ollama服务地址，同一进程内不重复探测
+_VALIDATED_OLLAMA: Set[str] = set()
+
+
+def _slide_key(slide: Any) -> tuple:
+    """提取构建提示所需的幻灯片字段，作为可哈希的缓存键"""
+    tables = tuple(
+        (table['rows'], table['cols'], tuple(tuple(row) for row in table['data']))
+        for table in slide.tables
+    )
+    return (slide.title, slide.text_content, tuple(slide.bullet_points), tables, slide.notes)
+
+
+@lru_cache(maxsize=1024)
+def _slide_prompt(key: tuple) -> str:
+    """
+    构建单张幻灯片在提示中的内容部分
+    
+    幻灯片提取后不再修改，按内容缓存，重试或批量回退到逐页处理时直接复用。
+    
+    Args:
+        key: _slide_key()的返回值
+        
+    Returns:
+        幻灯片内容文本
+    """
+    title, text_content, bullet_points, tables, notes = key
+    
+    parts = [f"幻灯片标题: {title}\n\n幻灯片文本内容:\n{text_content}\n\n项目符号列表:\n"]
+    parts.extend(f"{i}. {point}\n" for i, point in enumerate(bullet_points, 1))
+    
+    if tables:
+        parts.append("\n表格内容:\n")
+        for rows, cols, data in tables:
+            parts.append(f"表格 ({rows}x{cols}):\n")
+            parts.extend(" | ".join(row) + "\n" for row in data)
+    
+    if notes:
+        parts.append(f"\n备注内容:\n{notes}")
+    
+    return "".join(parts)
+
 
 @dataclass
 class ProcessedSlide:
@@ -33,30 +127,178 @@ class ProcessedSlide:
 class AIProcessor:
     """AI处理器类"""
     
+    # 优先匹配```json代码块中的内容，否则取最外层的花括号/方括号
+    _JSON_RE = re.compile(r'```(?:json)?\s*(\{.*?\})\s*```|(\{.*\})', re.DOTALL)
+    _JSON_ARRAY_RE = re.compile(r'```(?:json)?\s*(\[.*?\])\s*```|(\[.*\])', re.DOTALL)
+    
+    # 提示中的固定部分，每张幻灯片只格式化中间的动态内容
+    _PROMPT_HEADER = "你是一个专业的PPT内容分析助手。请分析以下PPT幻灯片内容，并生成结构化的知识点。\n\n"
+    
+    _PROMPT_FOOTER = """
+请按照以下JSON格式返回结果:
+{
+  "content": "整理后的完整内容，保持原意但更清晰",
+  "summary": "100字以内的摘要",
+  "key_points": ["关键点1", "关键点2", ...],
+  "tags": ["标签1", "标签2", ...]
+}
+
+要求:
+1. 内容要专业、准确、完整
+2. 摘要要简洁明了
+3. 关键点要突出核心信息
+4. 标签要反映主题和领域
+5. 保持原始信息的完整性
+"""
+    
+    _BATCH_PROMPT_HEADER = (
+        "你是一个专业的PPT内容分析助手。请分别分析以下{count}张PPT幻灯片内容，"
+        "并为每张幻灯片生成结构化的知识点。\n\n"
+    )
+    
+    _BATCH_PROMPT_FOOTER = """
+请按照以下JSON数组格式返回结果，数组中包含{count}个对象，顺序与幻灯片编号一一对应:
+[
+  {{
+    "content": "整理后的完整内容，保持原意但更清晰",
+    "summary": "100字以内的摘要",
+    "key_points": ["关键点1", "关键点2", ...],
+    "tags": ["标签1", "标签2", ...]
+  }},
+  ...
+]
+
+要求:
+1. 内容要专业、准确、完整
+2. 摘要要简洁明了
+3. 关键点要突出核心信息
+4. 标签要反映主题和领域
+5. 保持原始信息的完整性
+6. 只返回JSON数组，不要合并或遗漏任何幻灯片
+"""
+    
+    # get_or_create复用的实例，键为(服务, 基础URL, 模型, API密钥哈希)
+    _instances: Dict[tuple, "AIProcessor"] = {}
+    _instances_lock = threading.Lock()
+    
     def __init__(self, config):
         self.config = config
         self.logger = get_logger(__name__)
-        self.ai_service = config.get("ai_service", "ollama")
-        self.model = config.get("model", "llama2" if self.ai_service == "ollama" else "gpt-3.5-turbo")
-        self.api_key = config.get("api_key")
-        self.base_url = config.get("base_url", 
-                                  "http://localhost:11434" if self.ai_service == "ollama" 
-                                  else "https://api.openai.com/v1")
+        self.ai_service, self.model, self.api_key, self.base_url = self._resolve_service(config)
+        self.batch_size = max(1, int(config.get("batch_size", 8)))
+        self.concurrency = max(1, int(config.get("ai_concurrency", 8)))
+        # 每页幻灯片的输出token上限，批量调用按页数放大
+        self.max_tokens = max(1, int(config.get("max_tokens", 2000)))
+        self.temperature = float(config.get("temperature", 0.3))
+        # 限制同时进行的API调用数量，避免触发服务端限流(429)
+        self._semaphore = threading.Semaphore(self.concurrency)
+        # 收到429后在此时间点（time.monotonic）之前暂停发起新的调用
+        self._backoff_until = 0.0
+        self._backoff_lock = threading.Lock()
+        
+        # 响应缓存（磁盘 + 进程内LRU）
+        self._cache_dir = Path(config.get("cache_dir", "~/.cache/aptdom/ai")).expanduser()
+        cache_mode = config.get("cache", "readWrite")
+        if cache_mode not in CACHE_MODES:
+            self.logger.warning(f"未知的缓存模式: {cache_mode}，已禁用缓存")
+            cache_mode = "off"
+        self._cache_read, self._cache_write = CACHE_MODES[cache_mode]
+        self._memory_cache: "OrderedDict[str, str]" = OrderedDict()
+        self._memory_cache_lock = threading.Lock()
+        
+        # 复用HTTP连接（keep-alive + TLS复用）
+        self.session = self._create_session()
         
         # 验证配置
         self._validate_config()
     
+    @classmethod
+    def get_or_create(cls, config) -> "AIProcessor":
+        """
+        获取共享的AI处理器实例
+        
+        同一进程内服务、基础URL、模型和API密钥相同的配置共用一个实例，
+        从而复用HTTP会话、响应缓存和验证结果。其余设置以首次创建时的配置为准。
+        
+        Args:
+            config: 配置对象
+            
+        Returns:
+            AI处理器实例
+        """
+        ai_service, model, api_key, base_url = cls._resolve_service(config)
+        api_key_hash = hashlib.sha256((api_key or "").encode("utf-8")).hexdigest()
+        key = (ai_service, base_url, model, api_key_hash)
+        
+        with cls._instances_lock:
+            processor = cls._instances.get(key)
+            if processor is None:
+                processor = cls(config)
+                cls._instances[key] = processor
+        
+        return processor
+    
+    @staticmethod
+    def _resolve_service(config) -> tuple:
+        """从配置中解析(服务, 模型, API密钥, 基础URL)"""
+        ai_service = config.get("ai_service", "ollama")
+        model = config.get("model", "llama2" if ai_service == "ollama" else "gpt-3.5-turbo")
+        api_key = config.get("api_key")
+        base_url = config.get("base_url", 
+                              "http://localhost:11434" if ai_service == "ollama" 
+                              else "https://api.openai.com/v1")
+        return ai_service, model, api_key, base_url
+    
+    def _create_session(self) -> "requests.Session":
+        """创建带连接池和重试策略的HTTP会话"""
+        # 读取超时不重试：POST可能已被服务端处理，重发会重复生成（和计费）
+        # 429不在适配器层重试，由_note_rate_limited按Retry-After（有上限）统一退避
+        retry = Retry(
+            total=3,
+            connect=1,
+            read=0,
+            backoff_factor=0.3,
+            status_forcelist=[500, 502, 503, 504],
+            allowed_methods=frozenset({"GET", "POST"}),
+            respect_retry_after_header=False,
+            # 重试耗尽后返回最后的响应，由调用方报告状态码
+            raise_on_status=False
+        )
+        pool_size = max(16, self.concurrency)
+        adapter = HTTPAdapter(pool_connections=16, pool_maxsize=pool_size, max_retries=retry)
+        
+        session = requests.Session()
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+    
+    def close(self):
+        """关闭HTTP会话，释放连接池"""
+        self.session.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
+    
     def _validate_config(self):
         """验证AI配置"""
         if self.ai_service == "openai" and not self.api_key:
             self.logger.warning("OpenAI服务需要API密钥，请设置api_key")
         
         if self.ai_service == "ollama":
+            if self.base_url in _VALIDATED_OLLAMA:
+                return
+            
             # 检查Ollama服务是否可用
             try:
-                response = requests.get(f"{self.base_url}/api/tags")
+                response = self.session.get(f"{self.base_url}/api/tags", timeout=2)
                 if response.status_code != 200:
                     self.logger.warning(f"Ollama服务可能不可用: {response.status_code}")
+                else:
+                    _VALIDATED_OLLAMA.add(self.base_url)
             except Exception as e:
                 self.logger.warning(f"无法连接到Ollama服务: {e}")
     
@@ -64,116 +306,269 @@ class AIProcessor:
         """
         处理幻灯片内容
         
+        每batch_size页幻灯片合并为一次AI调用，批量解析失败时回退到逐页处理；
+        各批次通过线程池并发调用AI API，结果按原始顺序返回。
+        
         Args:
             slides_data: 原始幻灯片数据
             
         Returns:
             处理后的幻灯片数据
         """
-        processed_slides = []
+        if not slides_data:
+            return []
+        
+        batches = [
+            slides_data[start:start + self.batch_size]
+            for start in range(0, len(slides_data), self.batch_size)
+        ]
+        results: List[Optional[List[ProcessedSlide]]] = [None] * len(batches)
+        
+        with ThreadPoolExecutor(max_workers=min(self.concurrency, len(batches))) as executor:
+            future_to_index = {
+                executor.submit(self._process_chunk, batch): i
+                for i, batch in enumerate(batches)
+            }
+            
+            for future in as_completed(future_to_index):
+                i = future_to_index[future]
+                try:
+                    results[i] = future.result()
+                except Exception as e:
+                    self.logger.error(f"处理幻灯片批次时出错: {e}")
+                    results[i] = [self._fallback_slide(slide, e) for slide in batches[i]]
+        
+        return [slide for chunk in results for slide in chunk]
+    
+    def _process_chunk(self, batch: List[Any]) -> List[ProcessedSlide]:
+        """处理一个批次的幻灯片"""
+        if len(batch) == 1:
+            return [self._process_single_slide(batch[0])]
+        return self._process_batch(batch)
+    
+    def _process_single_slide(self, slide: Any) -> ProcessedSlide:
+        """逐页处理单张幻灯片"""
+        self.logger.debug(f"处理第{slide.slide_index}页幻灯片")
+        
+        # 构建提示
+        prompt = self._build_prompt(slide)
         
-        for slide in slides_data:
-            self.logger.debug(f"处理第{slide.slide_index}页幻灯片")
+        # 调用AI API
+        try:
+            ai_response = self._call_ai_api(prompt)
             
-            # 构建提示
-            prompt = self._build_prompt(slide)
+            # 解析响应
+            return self._parse_ai_response(slide, ai_response)
             
-            # 调用AI API
-            try:
-                ai_response = self._call_ai_api(prompt)
-                
-                # 解析响应
-                processed_slide = self._parse_ai_response(slide, ai_response)
-                processed_slides.append(processed_slide)
-                
-            except Exception as e:
-                self.logger.error(f"处理第{slide.slide_index}页幻灯片时出错: {e}")
-                # 创建基本处理结果
-                processed_slide = ProcessedSlide(
-                    slide_index=slide.slide_index,
-                    title=slide.title,
-                    content=slide.text_content,
-                    summary=f"AI处理失败: {str(e)}",
-                    key_points=slide.bullet_points,
-                    tags=[],
-                    metadata={"error": str(e)}
-                )
-                processed_slides.append(processed_slide)
+        except Exception as e:
+            self.logger.error(f"处理第{slide.slide_index}页幻灯片时出错: {e}")
+            return self._fallback_slide(slide, e)
+    
+    def _fallback_slide(self, slide: Any, error: Exception) -> ProcessedSlide:
+        """AI处理失败时创建基本处理结果"""
+        return ProcessedSlide(
+            slide_index=slide.slide_index,
+            title=slide.title,
+            content=slide.text_content,
+            summary=f"AI处理失败: {str(error)}",
+            key_points=slide.bullet_points,
+            tags=[],
+            metadata={"error": str(error)}
+        )
+    
+    def _process_batch(self, slides: List[Any]) -> List[ProcessedSlide]:
+        """将多张幻灯片合并为一次AI调用处理"""
+        self.logger.debug(f"批量处理第{slides[0].slide_index}-{slides[-1].slide_index}页幻灯片")
         
-        return processed_slides
+        prompt = self._build_batch_prompt(slides)
+        
+        try:
+            ai_response = self._call_ai_api(prompt, validate=lambda response: self._check_batch_response(slides, response),
+                                            slide_count=len(slides))
+            return self._parse_batch_response(slides, ai_response)
+        except Exception as e:
+            self.logger.warning(f"批量处理失败，回退到逐页处理: {e}")
+            return [self._process_single_slide(slide) for slide in slides]
     
     def _build_prompt(self, slide: Any) -> str:
         """构建AI提示"""
-        prompt = f"""你是一个专业的PPT内容分析助手。请分析以下PPT幻灯片内容，并生成结构化的知识点。
-
-幻灯片标题: {slide.title}
-
-幻灯片文本内容:
-{slide.text_content}
-
-项目符号列表:
-"""
+        return self._PROMPT_HEADER + _slide_prompt(_slide_key(slide)) + self._PROMPT_FOOTER
+    
+    def _build_batch_prompt(self, slides: List[Any]) -> str:
+        """构建多张幻灯片的批量AI提示"""
+        parts = [self._BATCH_PROMPT_HEADER.format(count=len(slides))]
         
-        for i, point in enumerate(slide.bullet_points, 1):
-            prompt += f"{i}. {point}\n"
+        for i, slide in enumerate(slides, 1):
+            parts.append(f"[[SLIDE {i}]]\n")
+            parts.append(_slide_prompt(_slide_key(slide)))
+            parts.append("\n")
         
-        if slide.tables:
-            prompt += "\n表格内容:\n"
-            for table in slide.tables:
-                prompt += f"表格 ({table['rows']}x{table['cols']}):\n"
-                for row in table['data']:
-                    prompt += " | ".join(row) + "\n"
+        parts.append(self._BATCH_PROMPT_FOOTER.format(count=len(slides)))
         
-        if slide.notes:
-            prompt += f"\n备注内容:\n{slide.notes}"
+        return "".join(parts)
+    
+    def _call_ai_api(self, prompt: str, validate: Optional[Callable[[str], None]] = None,
+                     slide_count: int = 1) -> str:
+        """
+        调用AI API，相同的服务/模型/提示直接返回缓存结果
         
-        prompt += """
-请按照以下JSON格式返回结果:
-{
-  "content": "整理后的完整内容，保持原意但更清晰",
-  "summary": "100字以内的摘要",
-  "key_points": ["关键点1", "关键点2", ...],
-  "tags": ["标签1", "标签2", ...]
-}
-
-要求:
-1. 内容要专业、准确、完整
-2. 摘要要简洁明了
-3. 关键点要突出核心信息
-4. 标签要反映主题和领域
-5. 保持原始信息的完整性
-"""
+        Args:
+            prompt: 提示
+            validate: 检查响应能否解析，抛出异常时不写入缓存；默认要求响应为JSON对象
+            slide_count: 提示中的幻灯片数，输出token上限按页数放大，避免批量响应被截断
+        """
+        max_tokens = self.max_tokens * slide_count
+        key = self._cache_key(prompt, max_tokens)
+        
+        if self._cache_read:
+            cached = self._read_cache(key)
+            if cached is not None:
+                self.logger.debug(f"命中AI响应缓存: {key[:8]}")
+                return cached
+        
+        self._wait_backoff()
+        
+        with self._semaphore:
+            if self.ai_service == "ollama":
+                response = self._call_ollama_api(prompt, max_tokens)
+            else:
+                response = self._call_openai_api(prompt, max_tokens)
+        
+        # 空响应或无法解析的响应不写入缓存，否则同一提示会一直返回这次的错误结果
+        if self._cache_write:
+            try:
+                (validate or self._check_response)(response)
+            except Exception as e:
+                self.logger.debug(f"AI响应无法解析，不写入缓存: {e}")
+            else:
+                self._write_cache(key, response)
         
-        return prompt
+        return response
     
-    def _call_ai_api(self, prompt: str) -> str:
-        """调用AI API"""
-        if self.ai_service == "ollama":
-            return self._call_ollama_api(prompt)
-        else:
-            return self._call_openai_api(prompt)
+    def _check_response(self, ai_response: str):
+        """检查单页响应是否为JSON对象"""
+        if not isinstance(_loads(self._extract_json(ai_response)), dict):
+            raise ValueError("AI响应不是JSON对象")
+    
+    def _check_batch_response(self, slides: List[Any], ai_response: str):
+        """检查批量响应是否为与幻灯片数量一致的JSON数组"""
+        data = _loads(self._extract_json_array(ai_response))
+        if not isinstance(data, list) or len(data) != len(slides):
+            raise ValueError(f"批量响应数量不匹配: 期望{len(slides)}项")
+    
+    def _wait_backoff(self):
+        """如果之前收到过429，等待到限流结束再发起调用"""
+        with self._backoff_lock:
+            delay = self._backoff_until - time.monotonic()
+        
+        if delay > 0:
+            self.logger.debug(f"API限流中，等待{delay:.1f}秒")
+            time.sleep(delay)
     
-    def _call_ollama_api(self, prompt: str) -> str:
-        """调用Ollama API"""
+    def _note_rate_limited(self, retry_after: Optional[str]):
+        """根据Retry-After头记录限流结束时间"""
+        delay = _DEFAULT_RETRY_AFTER
+        if retry_after:
+            try:
+                delay = float(retry_after)
+            except ValueError:
+                try:
+                    delay = parsedate_to_datetime(retry_after).timestamp() - time.time()
+                except (TypeError, ValueError):
+                    pass
+        delay = min(max(delay, 0.0), _MAX_RETRY_AFTER)
+        
+        with self._backoff_lock:
+            self._backoff_until = max(self._backoff_until, time.monotonic() + delay)
+    
+    def _cache_key(self, prompt: str, max_tokens: int) -> str:
+        """计算缓存键：同一模型名在不同服务地址或生成参数下的响应互不共用"""
+        key = f"{self.ai_service}|{self.base_url}|{self.model}|{self.temperature}|{max_tokens}|{prompt}"
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()
+    
+    def _cache_path(self, key: str) -> Path:
+        """缓存文件路径，按键前两位分目录"""
+        return self._cache_dir / key[:2] / key[2:]
+    
+    def _read_cache(self, key: str) -> Optional[str]:
+        """读取缓存，先查进程内LRU再查磁盘"""
+        with self._memory_cache_lock:
+            if key in self._memory_cache:
+                self._memory_cache.move_to_end(key)
+                return self._memory_cache[key]
+        
+        try:
+            response = self._cache_path(key).read_text(encoding="utf-8")
+        except OSError:
+            return None
+        
+        self._remember(key, response)
+        return response
+    
+    def _write_cache(self, key: str, response: str):
+        """写入缓存（先写临时文件再重命名，保证原子性）"""
+        self._remember(key, response)
+        
+        cache_path = self._cache_path(key)
+        try:
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_name = tempfile.mkstemp(dir=cache_path.parent, prefix=".tmp-")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(response)
+            os.replace(tmp_name, cache_path)
+        except OSError as e:
+            self.logger.warning(f"写入AI响应缓存失败: {e}")
+    
+    def _remember(self, key: str, response: str):
+        """放入进程内LRU缓存"""
+        with self._memory_cache_lock:
+            self._memory_cache[key] = response
+            self._memory_cache.move_to_end(key)
+            if len(self._memory_cache) > _MEMORY_CACHE_SIZE:
+                self._memory_cache.popitem(last=False)
+    
+    def _call_ollama_api(self, prompt: str, max_tokens: Optional[int] = None) -> str:
+        """调用Ollama API，max_tokens默认为单页的输出token上限"""
         url = f"{self.base_url}/api/generate"
         
         payload = {
             "model": self.model,
             "prompt": prompt,
-            "stream": False
+            "stream": True,
+            "options": {
+                "num_predict": max_tokens or self.max_tokens,
+                "temperature": self.temperature
+            }
         }
         
-        self.logger.debug(f"调用Ollama API: {url}")
-        response = requests.post(url, json=payload, timeout=60)
+        headers = {"Content-Type": "application/json"}
         
-        if response.status_code != 200:
-            raise Exception(f"Ollama API错误: {response.status_code} - {response.text}")
+        self.logger.debug(f"调用Ollama API: {url}")
+        response = self.session.post(url, headers=headers, data=_dumps(payload),
+                                     stream=True, timeout=(5, 300))
         
-        result = response.json()
-        return result.get("response", "")
+        try:
+            if response.status_code != 200:
+                raise Exception(f"Ollama API错误: {response.status_code} - {response.text}")
+            
+            # 逐行解析流式响应，最后一次性拼接
+            chunks = []
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                result = _loads(line)
+                if "error" in result:
+                    raise Exception(f"Ollama API错误: {result['error']}")
+                chunks.append(result.get("response", ""))
+                if result.get("done"):
+                    break
+            
+            return "".join(chunks)
+        finally:
+            response.close()
     
-    def _call_openai_api(self, prompt: str) -> str:
-        """调用OpenAI API"""
+    def _call_openai_api(self, prompt: str, max_tokens: Optional[int] = None) -> str:
+        """调用OpenAI API，max_tokens默认为单页的输出token上限"""
         url = f"{self.base_url}/chat/completions"
         
         headers = {
@@ -187,12 +582,15 @@ class AIProcessor:
                 {"role": "system", "content": "你是一个专业的PPT内容分析助手，擅长将PPT内容转换为结构化的知识点。"},
                 {"role": "user", "content": prompt}
             ],
-            "temperature": 0.3,
-            "max_tokens": 2000
+            "temperature": self.temperature,
+            "max_tokens": max_tokens or self.max_tokens
         }
         
         self.logger.debug(f"调用OpenAI API: {url}")
-        response = requests.post(url, headers=headers, json=payload, timeout=60)
+        response = self.session.post(url, headers=headers, data=_dumps(payload), timeout=_OPENAI_TIMEOUT)
+        
+        if response.status_code == 429:
+            self._note_rate_limited(response.headers.get("Retry-After"))
         
         if response.status_code != 200:
             raise Exception(f"OpenAI API错误: {response.status_code} - {response.text}")
@@ -205,24 +603,25 @@ class AIProcessor:
         try:
             # 尝试解析JSON
             json_str = self._extract_json(ai_response)
-            data = json.loads(json_str)
+            if ijson is not None and len(json_str) >= _STREAM_PARSE_THRESHOLD:
+                data = self._stream_fields(json_str)
+            else:
+                data = _loads(json_str)
             
-            return ProcessedSlide(
-                slide_index=original_slide.slide_index,
-                title=original_slide.title,
-                content=data.get("content", original_slide.text_content),
-                summary=data.get("summary", ""),
-                key_points=data.get("key_points", original_slide.bullet_points),
-                tags=data.get("tags", []),
-                metadata={
-                    "original_text": original_slide.text_content,
-                    "original_bullets": original_slide.bullet_points,
-                    "ai_service": self.ai_service,
-                    "model": self.model
-                }
-            )
+            return self._build_processed_slide(original_slide, data)
         except Exception as e:
             self.logger.warning(f"解析AI响应失败: {e}")
+            
+            # 只保留响应开头用于排查，完整响应仅在调试模式下保留
+            metadata = {
+                "original_text": original_slide.text_content,
+                "ai_response_head": ai_response[:_RESPONSE_HEAD_SIZE],
+                "ai_response_len": len(ai_response),
+                "parse_error": str(e)
+            }
+            if self.logger.isEnabledFor(logging.DEBUG):
+                metadata["ai_response"] = ai_response
+            
             # 回退到基本处理
             return ProcessedSlide(
                 slide_index=original_slide.slide_index,
@@ -231,21 +630,103 @@ class AIProcessor:
                 summary="AI处理完成，但解析失败",
                 key_points=original_slide.bullet_points,
                 tags=[],
-                metadata={
-                    "original_text": original_slide.text_content,
-                    "ai_response": ai_response,
-                    "parse_error": str(e)
-                }
+                metadata=metadata
             )
     
-    def _extract_json(self, text: str) -> str:
-        """从文本中提取JSON部分"""
-        # 查找JSON开始和结束
-        start = text.find("{")
-        end = text.rfind("}")
+    def _stream_fields(self, json_str: str) -> Dict[str, Any]:
+        """
+        使用ijson流式解析AI响应，只收集ProcessedSlide需要的字段
         
-        if start != -1 and end != -1:
-            return text[start:end+1]
+        Args:
+            json_str: JSON文本
+            
+        Returns:
+            仅包含响应中出现的content/summary/key_points/tags字段
+            
+        Raises:
+            ValueError: 响应不是JSON对象
+        """
+        fields: Dict[str, Any] = {}
+        # ijson读取str已弃用，按UTF-8字节解析
+        events = ijson.parse(json_str.encode("utf-8"))
+        
+        prefix, event, value = next(events)
+        if event != "start_map":
+            raise ValueError("AI响应不是JSON对象")
+        
+        for prefix, event, value in events:
+            if prefix in _SCALAR_FIELDS:
+                if event in ("string", "number", "boolean", "null"):
+                    fields[prefix] = value
+            elif prefix in _LIST_FIELDS:
+                if event == "start_array":
+                    fields[prefix] = []
+            elif prefix.endswith(".item"):
+                field = prefix[:-5]
+                if field in _LIST_FIELDS and event in ("string", "number", "boolean"):
+                    fields[field].append(value)
+        
+        return fields
+    
+    def _parse_batch_response(self, original_slides: List[Any], ai_response: str) -> List[ProcessedSlide]:
+        """
+        解析批量AI响应
+        
+        Args:
+            original_slides: 本批次的原始幻灯片
+            ai_response: AI返回的JSON数组文本
+            
+        Returns:
+            与original_slides按索引对齐的处理结果
+            
+        Raises:
+            ValueError: 响应不是与幻灯片数量一致的JSON数组
+        """
+        data = _loads(self._extract_json_array(ai_response))
+        
+        if not isinstance(data, list) or len(data) != len(original_slides):
+            raise ValueError(f"批量响应数量不匹配: 期望{len(original_slides)}项")
+        
+        processed_slides = []
+        for original_slide, item in zip(original_slides, data):
+            if isinstance(item, dict):
+                processed_slides.append(self._build_processed_slide(original_slide, item))
+            else:
+                # 单项格式错误时只对该页单独重试
+                processed_slides.append(self._process_single_slide(original_slide))
+        
+        return processed_slides
+    
+    def _build_processed_slide(self, original_slide: Any, data: Dict[str, Any]) -> ProcessedSlide:
+        """根据解析后的AI数据构建处理结果"""
+        return ProcessedSlide(
+            slide_index=original_slide.slide_index,
+            title=original_slide.title,
+            content=data.get("content", original_slide.text_content),
+            summary=data.get("summary", ""),
+            key_points=data.get("key_points", original_slide.bullet_points),
+            tags=data.get("tags", []),
+            metadata={
+                "original_text": original_slide.text_content,
+                "original_bullets": original_slide.bullet_points,
+                "ai_service": self.ai_service,
+                "model": self.model
+            }
+        )
+    
+    def _extract_json(self, text: str) -> str:
+        """从文本中提取JSON部分（支持```json代码块）"""
+        match = self._JSON_RE.search(text)
+        if match:
+            return match.group(1) or match.group(2)
         
         # 如果没有找到JSON，返回原始文本
         return text
+    
+    def _extract_json_array(self, text: str) -> str:
+        """从文本中提取JSON数组部分（支持```json代码块）"""
+        match = self._JSON_ARRAY_RE.search(text)
+        if match:
+            return match.group(1) or match.group(2)
+        
+        return text
@@ -4,38 +4,122 @@
 """
 
 import os
-import json
+from functools import lru_cache
 from pathlib import Path
-from typing import Any, Dict, Optional
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, Optional, Tuple
 
 import logging
 import time
 from .logging_config import get_logger
 
+# python-rapidjson为可选依赖（pip install .[fast]），未安装时回退到标准库json
+try:
+    import rapidjson as _json
+except ImportError:
+    import json as _json
+
 logger = get_logger(__name__)
 
+# 全局配置的只读视图，模块级get()直接在此查找；_FAST_HASH为None时表示需要重新获取
+_FAST_CACHE: Mapping[str, Any] = MappingProxyType({})
+_FAST_HASH: Optional[str] = None
+
+# 默认配置
+_DEFAULT_CONFIG: Dict[str, Any] = {
+    "ai_service": "ollama",
+    "model": "llama2",
+    "base_url": "http://localhost:11434",
+    "api_key": "",
+    "output_format": "docx",
+    "enable_ocr": False,
+    "tesseract_path": "",
+    "ocr_backend": "tesseract",
+    "ocr_lang": "eng",
+    "verbose": False,
+    "max_tokens": 2000,
+    "temperature": 0.3,
+    "batch_size": 8,
+    "ai_concurrency": 8,
+    "cache": "readWrite",
+    "cache_dir": "~/.cache/aptdom/ai"
+}
+
+# AI响应缓存模式: (是否读取缓存, 是否写入缓存)
+CACHE_MODES: Mapping[str, Tuple[bool, bool]] = MappingProxyType({
+    "readWrite": (True, True),
+    "readOnly": (True, False),
+    "writeOnly": (False, True),
+    "off": (False, False),
+})
+
+# 环境变量到配置键的映射
+_ENV_MAPPING = (
+    ("AI_SERVICE", "ai_service"),
+    ("MODEL", "model"),
+    ("BASE_URL", "base_url"),
+    ("API_KEY", "api_key"),
+    ("OUTPUT_FORMAT", "output_format"),
+    ("ENABLE_OCR", "enable_ocr"),
+    ("TESSERACT_PATH", "tesseract_path"),
+    ("OCR_BACKEND", "ocr_backend"),
+    ("OCR_LANG", "ocr_lang"),
+    ("VERBOSE", "verbose"),
+    ("MAX_TOKENS", "max_tokens"),
+    ("TEMPERATURE", "temperature"),
+    ("BATCH_SIZE", "batch_size"),
+    ("AI_CONCURRENCY", "ai_concurrency"),
+    ("AI_CACHE", "cache"),
+    ("AI_CACHE_DIR", "cache_dir"),
+)
+
+# 需要类型转换的配置项
+_BOOL_KEYS = frozenset({"enable_ocr", "verbose"})
+_NUMERIC_KEYS = frozenset({"max_tokens", "temperature", "batch_size", "ai_concurrency"})
+
+# 视为布尔真值的字符串（小写）
+_TRUE_VALUES = frozenset({"true", "1", "yes", "on"})
+
+# .env文件中识别的配置项
+_DOTENV_KEYS = frozenset({
+    "AI_SERVICE", "MODEL", "BASE_URL", "API_KEY",
+    "OUTPUT_FORMAT", "ENABLE_OCR", "TESSERACT_PATH", "OCR_BACKEND", "OCR_LANG"
+})
+
+
+def _hashable(value: Any) -> Any:
+    """将配置值转换为可哈希的形式（列表转元组，字典转frozenset）"""
+    if isinstance(value, dict):
+        return frozenset((key, _hashable(item)) for key, item in value.items())
+    if isinstance(value, list):
+        return tuple(_hashable(item) for item in value)
+    return value
+
+
 class Config:
     """配置管理类"""
     
+    __slots__ = (
+        "config_file",
+        "_config",
+        "_config_hash",
+        "_last_load_time",
+        "_config_view",
+        "_source_mtimes",
+        "_source_env",
+        "_modified",
+    )
+    
     def __init__(self, config_file: Optional[str] = None):
         self.config_file = config_file
         self._config: Dict[str, Any] = {}
         self._config_hash: Optional[str] = None  # 用于缓存验证
         self._last_load_time: float = 0  # 最后加载时间
+        self._config_view: Mapping[str, Any] = MappingProxyType(self._config)  # get_all()返回的只读视图
+        self._source_mtimes: Tuple[Tuple[str, int], ...] = ()  # 加载时各配置来源文件的修改时间
+        self._source_env: Tuple[Optional[str], ...] = ()  # 加载时相关环境变量的值
+        self._modified: bool = False  # 加载后是否调用过set()
         
-        # 默认配置
-        self._default_config = {
-            "ai_service": "ollama",
-            "model": "llama2",
-            "base_url": "http://localhost:11434",
-            "api_key": "",
-            "output_format": "docx",
-            "enable_ocr": False,
-            "tesseract_path": "",
-            "verbose": False,
-            "max_tokens": 2000,
-            "temperature": 0.3
-        }
         # 加载配置
         self._load_config()
     
@@ -44,28 +128,32 @@ class Config:
         Args:
             force: 是否强制重新加载，忽略缓存
         """
+        # 先记录来源文件的修改时间，加载期间发生的修改会在下次检查时触发重新加载
+        self._source_mtimes = self._stat_sources()
+        self._source_env = self._env_values()
+        self._modified = False
+        
         # 1. 加载默认配置
-        self._config = self._default_config.copy()
+        self._config = _DEFAULT_CONFIG.copy()
+        self._config_view = MappingProxyType(self._config)
         
-        # 2. 加载环境变量
-        self._load_from_env()
+        # 配置字典已替换，模块级视图需要重新获取
+        global _FAST_HASH
+        _FAST_HASH = None
         
-        # 3. 加载配置文件
+        # 2. 加载配置文件
         if self.config_file:
             self._load_from_file(self.config_file)
         else:
             # 尝试加载默认配置文件
-            default_config_paths = [
-                Path("config.json"),
-                Path.home() / ".ppt_converter" / "config.json",
-                Path(__file__).parent.parent / "config.json"
-            ]
-            
-            for config_path in default_config_paths:
+            for config_path in self._default_config_paths():
                 if config_path.exists():
                     self._load_from_file(str(config_path))
                     break
         
+        # 3. 加载环境变量（覆盖配置文件中的同名配置）
+        self._load_from_env()
+        
         # 验证配置
         from .config_validator import validate_config
         is_valid, errors, warnings = validate_config(self._config)
@@ -78,69 +166,95 @@ class Config:
         for warning in warnings:
             logger.warning(f"配置警告: {warning}")
         
-        import hashlib
-        config_str = json.dumps(self._config, sort_keys=True)
-        self._config_hash = hashlib.md5(config_str.encode()).hexdigest()
+        # 只用于进程内检测配置变化，不需要加密哈希，也不需要跨进程稳定
+        config_items = frozenset((key, _hashable(value)) for key, value in self._config.items())
+        self._config_hash = f"{hash(config_items) & 0xFFFFFFFFFFFFFFFF:016x}"
         self._last_load_time = time.time()
         
         logger.debug(f"配置加载完成: 使用缓存={not force}, 配置哈希={self._config_hash[:8]}")
     
+    def _default_config_paths(self) -> List[Path]:
+        """默认配置文件路径（按优先级排序）"""
+        return [
+            Path("config.json"),
+            Path.home() / ".ppt_converter" / "config.json",
+            Path(__file__).parent.parent / "config.json"
+        ]
+    
+    def _dotenv_paths(self) -> List[Path]:
+        """.env文件路径（按优先级排序）"""
+        return [
+            Path(".env"),
+            Path.home() / ".ppt_converter" / ".env"
+        ]
+    
+    def _stat_sources(self) -> Tuple[Tuple[str, int], ...]:
+        """获取所有存在的配置来源文件及其修改时间"""
+        if self.config_file:
+            paths = [Path(self.config_file)]
+        else:
+            paths = self._default_config_paths()
+        paths += self._dotenv_paths()
+        
+        mtimes = []
+        for path in paths:
+            try:
+                mtimes.append((str(path), path.stat().st_mtime_ns))
+            except OSError:
+                continue
+        return tuple(mtimes)
+    
+    def _env_values(self) -> Tuple[Optional[str], ...]:
+        """获取配置相关的环境变量的当前值"""
+        env = os.environ
+        return tuple(env.get(env_key) for env_key, _ in _ENV_MAPPING)
+    
+    def _is_fresh(self) -> bool:
+        """自上次加载后配置来源文件、环境变量均未变化，且没有通过set()修改配置"""
+        return (not self._modified
+                and self._env_values() == self._source_env
+                and self._stat_sources() == self._source_mtimes)
+    
     def _load_from_env(self):
         """从环境变量加载配置"""
-        env_mapping = {
-            "AI_SERVICE": "ai_service",
-            "MODEL": "model",
-            "BASE_URL": "base_url",
-            "API_KEY": "api_key",
-            "OUTPUT_FORMAT": "output_format",
-            "ENABLE_OCR": "enable_ocr",
-            "TESSERACT_PATH": "tesseract_path",
-            "VERBOSE": "verbose",
-            "MAX_TOKENS": "max_tokens",
-            "TEMPERATURE": "temperature"
-        }
-        
-        for env_key, config_key in env_mapping.items():
-            env_value = os.getenv(env_key)
-            if env_value is not None:
-                # 类型转换
-                if config_key in ["enable_ocr", "verbose"]:
-                    self._config[config_key] = env_value.lower() in ["true", "1", "yes", "on"]
-                elif config_key in ["max_tokens", "temperature"]:
-                    self._config[config_key] = float(env_value) if "." in env_value else int(env_value)
-                else:
-                    self._config[config_key] = env_value
+        env = os.environ
+        for env_key, config_key in _ENV_MAPPING:
+            env_value = env.get(env_key)
+            if env_value is None:
+                continue
+            
+            # 类型转换
+            if config_key in _BOOL_KEYS:
+                self._config[config_key] = env_value.lower() in _TRUE_VALUES
+            elif config_key in _NUMERIC_KEYS:
+                self._config[config_key] = float(env_value) if "." in env_value else int(env_value)
+            else:
+                self._config[config_key] = env_value
         
         # 特殊处理：从.env文件加载
         self._load_from_dotenv()
     
     def _load_from_dotenv(self):
         """从.env文件加载配置"""
-        dotenv_paths = [
-            Path(".env"),
-            Path.home() / ".ppt_converter" / ".env"
-        ]
-        
-        for dotenv_path in dotenv_paths:
+        for dotenv_path in self._dotenv_paths():
             if dotenv_path.exists():
                 try:
-                    with open(dotenv_path, "r", encoding="utf-8") as f:
-                        for line in f:
-                            line = line.strip()
-                            if not line or line.startswith("#") or "=" not in line:
-                                continue
-                            
-                            key, value = line.split("=", 1)
-                            key = key.strip()
-                            value = value.strip().strip('"\'')
-                            
-                            if key in ["AI_SERVICE", "MODEL", "BASE_URL", "API_KEY", 
-                                     "OUTPUT_FORMAT", "ENABLE_OCR", "TESSERACT_PATH"]:
-                                config_key = key.lower()
-                                if config_key == "enable_ocr":
-                                    self._config[config_key] = value.lower() in ["true", "1", "yes", "on"]
-                                else:
-                                    self._config[config_key] = value
+                    for line in dotenv_path.read_text(encoding="utf-8").splitlines():
+                        line = line.strip()
+                        if not line or line[0] == "#":
+                            continue
+                        
+                        key, sep, value = line.partition("=")
+                        key = key.strip()
+                        if not sep or key not in _DOTENV_KEYS:
+                            continue
+                        
+                        value = value.strip().strip('"\'')
+                        config_key = key.lower()
+                        if config_key == "enable_ocr":
+                            self._config[config_key] = value.lower() in _TRUE_VALUES
+                        else:
+                            self._config[config_key] = value
                     
                     logger.debug(f"从{dotenv_path}加载配置")
                     break
@@ -155,8 +269,7 @@ class Config:
             return
         
         try:
-            with open(config_path, "r", encoding="utf-8") as f:
-                file_config = json.load(f)
+            file_config = _json.loads(config_path.read_bytes())
             
             # 更新配置
             self._config.update(file_config)
@@ -170,17 +283,18 @@ class Config:
         Args:
             key: 配置键
             default: 默认值
-            force_reload: 是否强制重新加载配置
+            force_reload: 是否重新加载配置（丢弃set()的修改；配置来源均未变化时直接使用已加载的配置）
         Returns:
             配置值
         """
-        if force_reload:
+        if force_reload and not self._is_fresh():
             self._load_config(force=True)
         return self._config.get(key, default)
     
     def set(self, key: str, value: Any):
         """设置配置值"""
         self._config[key] = value
+        self._modified = True
     
     def save(self, config_file: Optional[str] = None):
         """保存配置到文件"""
@@ -190,51 +304,59 @@ class Config:
         save_path.parent.mkdir(parents=True, exist_ok=True)
         
         try:
-            with open(save_path, "w", encoding="utf-8") as f:
-                json.dump(self._config, f, indent=2, ensure_ascii=False)
+            save_path.write_text(_json.dumps(self._config, indent=2, ensure_ascii=False), encoding="utf-8")
             
             logger.info(f"配置已保存到: {save_path}")
             
         except Exception as e:
             logger.error(f"保存配置失败: {e}")
     
-    def get_all(self, force_reload: bool = False) -> Dict[str, Any]:
+    def get_all(self, force_reload: bool = False) -> Mapping[str, Any]:
         """获取所有配置
         Args:
-            force_reload: 是否强制重新加载配置
+            force_reload: 是否重新加载配置（丢弃set()的修改；配置来源均未变化时直接使用已加载的配置）
         Returns:
-            当前的配置副本
+            当前配置的只读视图（随set()实时更新；需要修改时请用dict()复制）
         """
-        if force_reload:
+        if force_reload and not self._is_fresh():
             self._load_config(force=True)
-        return self._config.copy()
+        return self._config_view
     
     def print_config(self):
         """打印配置"""
-        print("当前配置:")
+        lines = ["当前配置:"]
         for key, value in self._config.items():
             # 隐藏敏感信息
             if key == "api_key" and value:
                 value = "*" * len(value)
-            print(f"  {key}: {value}")
+            lines.append(f"  {key}: {value}")
+        print("\n".join(lines))
 
 
-# 全局配置实例
-_config_instance = None
+@lru_cache(maxsize=None)
+def _get_config(config_file: Optional[str]) -> Config:
+    """按配置文件缓存的配置实例；只按位置传参，保证同一配置文件只有一个缓存键"""
+    return Config(config_file)
 
 
 def get_config(config_file: Optional[str] = None) -> Config:
-    """获取全局配置实例"""
-    global _config_instance
-    if _config_instance is None:
-        _config_instance = Config(config_file)
-    return _config_instance
+    """获取全局配置实例（每个配置文件对应一个实例）"""
+    return _get_config(config_file)
+
+
+def _rebuild_fast_cache(config: Config):
+    """获取全局配置实例的只读视图供模块级get()使用"""
+    global _FAST_CACHE, _FAST_HASH
+    _FAST_CACHE = config.get_all()
+    _FAST_HASH = config._config_hash
 
 
 # 便捷函数
 def get(key: str, default: Any = None) -> Any:
-    """便捷获取配置值"""
-    return get_config().get(key, default)
+    """便捷获取配置值（配置未重新加载时只做一次字典查找）"""
+    if _FAST_HASH is None:
+        _rebuild_fast_cache(get_config())
+    return _FAST_CACHE.get(key, default)
 
 
 def set(key: str, value: Any):
@@ -4,18 +4,39 @@
 """
 from typing import Dict, Any, List, Tuple
 import re
-from urllib.parse import urlparse
 
+from .config import CACHE_MODES
 from .logging_config import get_logger
 
 logger = get_logger(__name__)
 
+# URL必须包含协议和主机部分，如 http://localhost:11434
+_URL_RE = re.compile(r'^[a-zA-Z][a-zA-Z0-9+.\-]*://[^\s/?#]+')
+
+# 字段校验表: (配置键, 类型, 是否必需, 允许的取值)
+_SCHEMA = (
+    ("ai_service", "str", True, None),
+    ("model", "str", True, None),
+    ("output_format", "choice", True, ("docx", "markdown")),
+    ("enable_ocr", "bool", False, None),
+    ("ocr_backend", "choice", False, ("tesseract", "easyocr")),
+    ("ocr_lang", "str", False, None),
+    ("verbose", "bool", False, None),
+    ("max_tokens", "number", False, None),
+    ("temperature", "number", False, None),
+    ("batch_size", "positive_int", False, None),
+    ("ai_concurrency", "positive_int", False, None),
+    ("cache", "choice", False, tuple(CACHE_MODES)),
+    ("cache_dir", "str", False, None),
+)
+
+# 选项字段在错误信息中的名称
+_CHOICE_LABELS = {"output_format": "输出格式", "ocr_backend": "OCR后端", "cache": "缓存模式"}
+
+_OPENAI_MODEL_PREFIXES = ('gpt-', 'davinci-', 'curie-', 'babbage-', 'ada-')
+
 class ConfigValidator:
-    """配置验证器类"""
-    
-    def __init__(self):
-        self.errors: List[str] = []
-        self.warnings: List[str] = []
+    """配置验证器类（无状态，可在多线程间共享）"""
     
     def validate_config(self, config: Dict[str, Any]) -> Tuple[bool, List[str], List[str]]:
         """
@@ -27,108 +48,103 @@ class ConfigValidator:
         Returns:
             (是否有效, 错误列表, 警告列表)
         """
-        self.errors.clear()
-        self.warnings.clear()
+        errors: List[str] = []
+        warnings: List[str] = []
         
-        # 基本配置验证
-        self._validate_basic_config(config)
+        # 字段验证（必需字段、类型、取值范围）
+        self._validate_fields(config, errors, warnings)
         
         # AI服务特定验证
-        self._validate_ai_config(config)
+        self._validate_ai_config(config, errors, warnings)
         
         # OCR配置验证
-        self._validate_ocr_config(config)
+        self._validate_ocr_config(config, errors, warnings)
         
-        # 输出格式验证
-        self._validate_output_config(config)
-        
-        return (len(self.errors) == 0, self.errors.copy(), self.warnings.copy())
+        return (len(errors) == 0, errors, warnings)
     
-    def _validate_basic_config(self, config: Dict[str, Any]):
-        """验证基本配置"""
-        required_fields = ['ai_service', 'model', 'output_format']
-        
-        for field in required_fields:
-            if field not in config or not config[field]:
-                self.errors.append(f"必需字段 '{field}' 未设置")
-        
-        # 验证布尔值字段
-        boolean_fields = ['enable_ocr', 'verbose']
-        for field in boolean_fields:
-            if field in config and not isinstance(config[field], bool):
-                self.warnings.append(f"字段 '{field}' 应该是布尔值类型")
-        
-        # 验证数值字段
-        numeric_fields = ['max_tokens', 'temperature']
-        for field in numeric_fields:
-            if field in config:
+    def _validate_fields(self, config: Dict[str, Any], errors: List[str], warnings: List[str]):
+        """按_SCHEMA逐项验证字段"""
+        for key, kind, required, choices in _SCHEMA:
+            if key not in config or (required and not config[key]):
+                if required:
+                    errors.append(f"必需字段 '{key}' 未设置")
+                continue
+            
+            value = config[key]
+            if kind == "str":
+                if not isinstance(value, str):
+                    errors.append(f"字段 '{key}' 应该是字符串类型")
+            elif kind == "bool":
+                if not isinstance(value, bool):
+                    warnings.append(f"字段 '{key}' 应该是布尔值类型")
+            elif kind == "number":
                 try:
-                    float(config[field])
+                    float(value)
                 except (ValueError, TypeError):
-                    self.errors.append(f"字段 '{field}' 应该是数值类型")
+                    errors.append(f"字段 '{key}' 应该是数值类型")
+            elif kind == "positive_int":
+                if not self._is_positive_int(value):
+                    errors.append(f"字段 '{key}' 应该是正整数")
+            elif kind == "choice" and value not in choices:
+                errors.append(f"不支持的{_CHOICE_LABELS[key]}: {value}")
     
-    def _validate_ai_config(self, config: Dict[str, Any]):
+    def _validate_ai_config(self, config: Dict[str, Any], errors: List[str], warnings: List[str]):
         """验证AI服务配置"""
         ai_service = config.get('ai_service')
         
         if ai_service == 'openai':
             api_key = config.get('api_key')
             if not api_key:
-                self.errors.append("OpenAI服务需要API密钥")
+                errors.append("OpenAI服务需要API密钥")
             elif not self._is_valid_api_key(api_key):
-                self.warnings.append("API密钥格式可能无效")
+                warnings.append("API密钥格式可能无效")
             
             # 验证OpenAI模型
             model = config.get('model', '')
-            if model and not model.startswith(('gpt-', 'davinci-', 'curie-', 'babbage-', 'ada-')):
-                self.warnings.append(f"模型名称 '{model}' 可能不是有效的OpenAI模型")
+            if model and not model.startswith(_OPENAI_MODEL_PREFIXES):
+                warnings.append(f"模型名称 '{model}' 可能不是有效的OpenAI模型")
         
         elif ai_service == 'ollama':
             base_url = config.get('base_url', '')
             if base_url and not self._is_valid_url(base_url):
-                self.errors.append(f"无效的Ollama基础URL: {base_url}")
+                errors.append(f"无效的Ollama基础URL: {base_url}")
         
-        elif ai_service and ai_service not in ['openai', 'ollama']:
-            self.warnings.append(f"未知的AI服务: {ai_service}")
+        elif ai_service:
+            warnings.append(f"未知的AI服务: {ai_service}")
     
-    def _validate_ocr_config(self, config: Dict[str, Any]):
+    def _validate_ocr_config(self, config: Dict[str, Any], errors: List[str], warnings: List[str]):
         """验证OCR配置"""
         if config.get('enable_ocr'):
             tesseract_path = config.get('tesseract_path', '')
             if tesseract_path and not self._path_exists(tesseract_path):
-                self.warnings.append(f"Tesseract路径不存在: {tesseract_path}")
-    
-    def _validate_output_config(self, config: Dict[str, Any]):
-        """验证输出配置"""
-        output_format = config.get('output_format')
-        if output_format and output_format not in ['docx', 'markdown']:
-            self.errors.append(f"不支持的输出格式: {output_format}")
+                warnings.append(f"Tesseract路径不存在: {tesseract_path}")
     
     def _is_valid_api_key(self, api_key: str) -> bool:
         """验证API密钥格式"""
-        # OpenAI API密钥通常以'sk-'开头，长度为51个字符
-        if api_key.startswith('sk-') and len(api_key) == 51:
-            return True
-        
-        # Ollama或其他服务可能有不同的格式
-        if len(api_key) >= 10:  # 最小长度检查
-            return True
-        
-        return False
+        # OpenAI API密钥通常以'sk-'开头，长度为51个字符；
+        # Ollama或其他服务可能有不同的格式，因此只做最小长度检查
+        return len(api_key) >= 10
     
-    def _is_valid_url(self, url: str) -> bool:
-        """验证URL格式"""
+    def _is_positive_int(self, value: Any) -> bool:
+        """验证是否为正整数（允许"8"这样的数字字符串）"""
+        if isinstance(value, bool):
+            return False
         try:
-            result = urlparse(url)
-            return all([result.scheme, result.netloc])
-        except:
+            return int(value) == float(value) and int(value) > 0
+        except (ValueError, TypeError):
             return False
     
+    def _is_valid_url(self, url: str) -> bool:
+        """验证URL格式"""
+        return isinstance(url, str) and _URL_RE.match(url) is not None
+    
     def _path_exists(self, path: str) -> bool:
         """检查路径是否存在"""
         from pathlib import Path
         return Path(path).exists()
 
+_VALIDATOR = ConfigValidator()
+
 def validate_config(config: Dict[str, Any]) -> Tuple[bool, List[str], List[str]]:
     """
     便捷函数：验证配置
@@ -139,8 +155,7 @@ def validate_config(config: Dict[str, Any]) -> Tuple[bool, List[str], List[str]]
     Returns:
         (是否有效, 错误列表, 警告列表)
     """
-    validator = ConfigValidator()
-    return validator.validate_config(config)
+    return _VALIDATOR.validate_config(config)
 
 def print_validation_results(is_valid: bool, errors: List[str], warnings: List[str]):
     """打印验证结果"""
@@ -4,21 +4,71 @@
 """
 
 import logging
+import re
+from datetime import datetime
 from pathlib import Path
-from typing import List, Any
+from typing import List, Any, BinaryIO, Dict, Iterator, Optional, Tuple, Union
+from xml.sax.saxutils import escape, quoteattr
 from dataclasses import dataclass
 
 from .logging_config import get_logger
 
-try:
-    from docx import Document
-    from docx.shared import Inches, Pt
-    from docx.enum.text import WD_ALIGN_PARAGRAPH
-except ImportError:
-    get_logger(__name__).warning("python-docx库未安装，Docx生成功能将受限")
-
 logger = get_logger(__name__)
 
+# 段落分类: 标题(#...) | 项目符号(- 或 * ) | 编号列表(1. 或 1) )
+_PARA_RE = re.compile(r'(#+)\s*(.*)|[-*] (.*)|\d+[.)] (.*)')
+
+# 标题样式名到级别的映射
+_HEADING_LEVELS = {f"Heading {level}": level for level in range(1, 7)}
+
+# 直接生成OOXML时用到的段落样式
+_DOCX_STYLES = tuple(_HEADING_LEVELS) + ("List Bullet", "List Number")
+
+# 文本中需要转换为OOXML元素的控制字符
+_RUN_BREAKS = {
+    "\n": '</w:t><w:br/><w:t xml:space="preserve">',
+    "\r": '</w:t><w:br/><w:t xml:space="preserve">',
+    "\t": '</w:t><w:tab/><w:t xml:space="preserve">',
+}
+
+
+def _classify_paragraphs(text: str) -> Iterator[Tuple[Optional[str], str]]:
+    """
+    按行拆分格式化文本并识别段落类型
+    
+    Args:
+        text: Markdown风格的文本
+        
+    Yields:
+        (段落样式名, 段落文本)，普通段落的样式名为None
+    """
+    for para_text in text.splitlines():
+        if not para_text.strip():
+            continue
+        
+        match = _PARA_RE.match(para_text)
+        if match is None:
+            yield None, para_text
+            continue
+        
+        heading_marks, heading_text, bullet_text, list_text = match.groups()
+        if heading_marks:
+            yield f"Heading {min(len(heading_marks), 6)}", heading_text.strip()
+        elif bullet_text is not None:
+            yield "List Bullet", bullet_text.strip()
+        else:
+            yield "List Number", list_text.strip()
+
+
+def _xml_paragraph(text: str, style_id: Optional[str] = None) -> str:
+    """构建单个段落的OOXML，与python-docx的add_paragraph结果一致"""
+    style = f"<w:pPr><w:pStyle w:val={quoteattr(style_id)}/></w:pPr>" if style_id else ""
+    run = escape(text)
+    for char, replacement in _RUN_BREAKS.items():
+        if char in run:
+            run = run.replace(char, replacement)
+    return f'<w:p>{style}<w:r><w:t xml:space="preserve">{run}</w:t></w:r></w:p>'
+
 
 class DocumentGenerator:
     """文档生成器类"""
@@ -26,17 +76,23 @@ class DocumentGenerator:
     def __init__(self):
         self.logger = get_logger(__name__)
     
-    def generate_docx(self, processed_slides: List[Any], output_path: Path):
+    def generate_docx(self, processed_slides: List[Any], output_path: Union[Path, BinaryIO],
+                      front_matter: bool = True):
         """
         生成Docx文档
         
         Args:
             processed_slides: 处理后的幻灯片数据
-            output_path: 输出文件路径
+            output_path: 输出文件路径，也可以是可写的二进制文件对象（如BytesIO）
+            front_matter: 是否在正文前添加文档信息和目录
         """
         self.logger.info(f"生成Docx文档: {output_path}")
         
         try:
+            # python-docx依赖lxml，只在生成Docx时才导入
+            from docx import Document
+            from docx.enum.text import WD_ALIGN_PARAGRAPH
+            
             # 创建文档
             doc = Document()
             
@@ -49,22 +105,25 @@ class DocumentGenerator:
             title = doc.add_heading("PPT转换文档", 0)
             title.alignment = WD_ALIGN_PARAGRAPH.CENTER
             
-            # 添加元信息
-            self._add_metadata(doc, processed_slides)
-            
-            # 添加目录
-            doc.add_heading("目录", 1)
-            for i, slide in enumerate(processed_slides, 1):
-                doc.add_paragraph(f"{i}. {slide.title}", style="List Number")
-            
-            doc.add_page_break()
+            if front_matter:
+                # 添加元信息
+                self._add_metadata(doc, processed_slides)
+                
+                # 添加目录
+                doc.add_heading("目录", 1)
+                toc_entries = [f"{i}. {slide.title}" for i, slide in enumerate(processed_slides, 1)]
+                for entry in toc_entries:
+                    doc.add_paragraph(entry, style="List Number")
+                
+                doc.add_page_break()
             
-            # 添加幻灯片内容
+            # 添加幻灯片内容（每页生成一段OOXML后一次性插入）
+            style_ids = {name: doc.styles[name].style_id for name in _DOCX_STYLES}
             for slide in processed_slides:
-                self._add_slide_to_docx(doc, slide)
+                self._add_slide_to_docx(doc, slide, style_ids)
             
-            # 保存文档
-            doc.save(str(output_path))
+            # 保存文档（文件对象直接写入，不经过文件系统）
+            doc.save(output_path if hasattr(output_path, "write") else str(output_path))
             self.logger.info(f"Docx文档生成成功: {output_path}")
             
         except Exception as e:
@@ -84,20 +143,22 @@ class DocumentGenerator:
         try:
             with open(output_path, "w", encoding="utf-8") as f:
                 # 添加标题
-                f.write("# PPT转换文档\n\n")
+                parts = ["# PPT转换文档\n\n"]
                 
                 # 添加元信息
-                self._add_metadata_markdown(f, processed_slides)
+                self._add_metadata_markdown(parts, processed_slides)
                 
                 # 添加目录
-                f.write("## 目录\n\n")
-                for i, slide in enumerate(processed_slides, 1):
-                    f.write(f"{i}. [{slide.title}](#slide-{i})\n")
-                f.write("\n")
+                parts.append("## 目录\n\n")
+                parts.append("".join(f"{i}. [{slide.title}](#slide-{i})\n" for i, slide in enumerate(processed_slides, 1)))
+                parts.append("\n")
+                f.write("".join(parts))
                 
-                # 添加幻灯片内容
+                # 添加幻灯片内容（每页拼接后写入一次）
                 for slide in processed_slides:
-                    self._add_slide_to_markdown(f, slide)
+                    parts = []
+                    self._add_slide_to_markdown(parts, slide)
+                    f.write("".join(parts))
             
             self.logger.info(f"Markdown文档生成成功: {output_path}")
             
@@ -126,118 +187,145 @@ class DocumentGenerator:
         
         doc.add_paragraph()
     
-    def _add_metadata_markdown(self, f, processed_slides: List[Any]):
-        """添加元信息到Markdown文档"""
-        f.write("## 文档信息\n\n")
-        f.write(f"- **生成时间**: {self._get_current_time()}\n")
-        f.write(f"- **幻灯片数量**: {len(processed_slides)}\n")
+    def _add_metadata_markdown(self, parts: List[str], processed_slides: List[Any]):
+        """添加元信息到Markdown文档片段"""
+        parts.append("## 文档信息\n\n")
+        parts.append(f"- **生成时间**: {self._get_current_time()}\n")
+        parts.append(f"- **幻灯片数量**: {len(processed_slides)}\n")
         
         if processed_slides:
-            f.write(f"- **AI服务**: {processed_slides[0].metadata.get('ai_service', '未知')}\n")
-            f.write(f"- **模型**: {processed_slides[0].metadata.get('model', '未知')}\n")
+            parts.append(f"- **AI服务**: {processed_slides[0].metadata.get('ai_service', '未知')}\n")
+            parts.append(f"- **模型**: {processed_slides[0].metadata.get('model', '未知')}\n")
         
-        f.write("\n")
+        parts.append("\n")
     
-    def _add_slide_to_docx(self, doc: Any, slide: Any):
-        """添加幻灯片内容到Docx文档"""
+    def _add_slide_to_docx(self, doc: Any, slide: Any, style_ids: Dict[str, str]):
+        """
+        添加幻灯片内容到Docx文档
+        
+        整页内容先拼接为OOXML，再一次解析并插入文档，避免逐个段落调用python-docx。
+        metadata中的tables（表格数据）和notes（备注）按原样输出，不识别其中的Markdown标记。
+        
+        Args:
+            doc: Docx文档
+            slide: 处理后的幻灯片
+            style_ids: 段落样式名到样式ID的映射
+        """
+        heading1, heading2 = style_ids["Heading 1"], style_ids["Heading 2"]
+        
         # 添加幻灯片标题
-        doc.add_heading(f"{slide.slide_index}. {slide.title}", 1)
+        parts = [_xml_paragraph(f"{slide.slide_index}. {slide.title}", heading1)]
         
         # 添加摘要
         if slide.summary:
-            doc.add_heading("摘要", 2)
-            doc.add_paragraph(slide.summary)
+            parts.append(_xml_paragraph("摘要", heading2))
+            parts.append(_xml_paragraph(slide.summary))
         
         # 添加主要内容
         if slide.content:
-            doc.add_heading("主要内容", 2)
-            self._add_formatted_text(doc, slide.content)
+            parts.append(_xml_paragraph("主要内容", heading2))
+            self._append_formatted_xml(parts, slide.content, style_ids)
         
         # 添加关键点
         if slide.key_points:
-            doc.add_heading("关键点", 2)
-            for point in slide.key_points:
-                doc.add_paragraph(point, style="List Bullet")
+            parts.append(_xml_paragraph("关键点", heading2))
+            bullet = style_ids["List Bullet"]
+            parts.extend(_xml_paragraph(point, bullet) for point in slide.key_points)
+        
+        # 添加表格（表格由python-docx创建，先插入已拼接的内容）
+        if slide.metadata.get("tables"):
+            self._append_xml(doc, "".join(parts))
+            parts = []
+            for table_data in slide.metadata["tables"]:
+                create_table_from_data(doc, table_data)
+        
+        # 添加备注
+        if slide.metadata.get("notes"):
+            parts.append(_xml_paragraph("备注", heading2))
+            parts.append(_xml_paragraph(slide.metadata["notes"]))
         
         # 添加标签
         if slide.tags:
-            doc.add_heading("标签", 2)
-            tags_text = ", ".join(slide.tags)
-            doc.add_paragraph(tags_text)
+            parts.append(_xml_paragraph("标签", heading2))
+            parts.append(_xml_paragraph(", ".join(slide.tags)))
         
         # 添加原始文本（如果需要）
         if slide.metadata.get("original_text") and slide.metadata["original_text"] != slide.content:
-            doc.add_heading("原始文本", 2)
-            self._add_formatted_text(doc, slide.metadata["original_text"])
+            parts.append(_xml_paragraph("原始文本", heading2))
+            self._append_formatted_xml(parts, slide.metadata["original_text"], style_ids)
         
         # 添加分页符
-        doc.add_page_break()
+        parts.append('<w:p><w:r><w:br w:type="page"/></w:r></w:p>')
+        
+        self._append_xml(doc, "".join(parts))
     
-    def _add_slide_to_markdown(self, f, slide: Any):
-        """添加幻灯片内容到Markdown文档"""
+    def _append_formatted_xml(self, parts: List[str], text: str, style_ids: Dict[str, str]):
+        """将格式化文本转换为OOXML段落追加到parts"""
+        parts.extend(
+            _xml_paragraph(para_text, style_ids[style] if style else None)
+            for style, para_text in _classify_paragraphs(text)
+        )
+    
+    def _append_xml(self, doc: Any, xml: str):
+        """解析OOXML片段并插入到文档正文末尾（节属性之前）"""
+        from docx.oxml import parse_xml
+        from docx.oxml.ns import nsdecls
+        
+        fragment = parse_xml(f"<w:body {nsdecls('w')}>{xml}</w:body>")
+        body = doc.element.body
+        sect_pr = body.sectPr
+        for element in list(fragment):
+            if sect_pr is not None:
+                sect_pr.addprevious(element)
+            else:
+                body.append(element)
+    
+    def _add_slide_to_markdown(self, parts: List[str], slide: Any):
+        """添加幻灯片内容到Markdown文档片段"""
         # 添加幻灯片标题
-        f.write(f"## <a name=\"slide-{slide.slide_index}\"></a>{slide.slide_index}. {slide.title}\n\n")
+        parts.append(f"## <a name=\"slide-{slide.slide_index}\"></a>{slide.slide_index}. {slide.title}\n\n")
         
         # 添加摘要
         if slide.summary:
-            f.write("### 摘要\n\n")
-            f.write(f"{slide.summary}\n\n")
+            parts.append("### 摘要\n\n")
+            parts.append(f"{slide.summary}\n\n")
         
         # 添加主要内容
         if slide.content:
-            f.write("### 主要内容\n\n")
-            f.write(f"{slide.content}\n\n")
+            parts.append("### 主要内容\n\n")
+            parts.append(f"{slide.content}\n\n")
         
         # 添加关键点
         if slide.key_points:
-            f.write("### 关键点\n\n")
-            for point in slide.key_points:
-                f.write(f"- {point}\n")
-            f.write("\n")
+            parts.append("### 关键点\n\n")
+            parts.extend(f"- {point}\n" for point in slide.key_points)
+            parts.append("\n")
         
         # 添加标签
         if slide.tags:
-            f.write("### 标签\n\n")
-            f.write(f"{', '.join(slide.tags)}\n\n")
+            parts.append("### 标签\n\n")
+            parts.append(f"{', '.join(slide.tags)}\n\n")
         
         # 添加原始文本（如果需要）
         if slide.metadata.get("original_text") and slide.metadata["original_text"] != slide.content:
-            f.write("### 原始文本\n\n")
-            f.write(f"{slide.metadata['original_text']}\n\n")
+            parts.append("### 原始文本\n\n")
+            parts.append(f"{slide.metadata['original_text']}\n\n")
         
-        f.write("---\n\n")
+        parts.append("---\n\n")
     
     def _add_formatted_text(self, doc: Any, text: str):
         """添加格式化文本到Docx文档"""
-        # 按段落分割
-        paragraphs = text.split("\n")
-        
-        for para_text in paragraphs:
-            if not para_text.strip():
-                continue
-                
-            para = doc.add_paragraph()
-            
-            # 检查是否为标题
-            if para_text.startswith("#"):
-                level = min(para_text.count("#"), 6)
-                heading_text = para_text.lstrip("#").strip()
-                doc.add_heading(heading_text, level)
-            # 检查是否为项目符号
-            elif para_text.startswith("- ") or para_text.startswith("* "):
-                bullet_text = para_text[2:].strip()
-                doc.add_paragraph(bullet_text, style="List Bullet")
-            # 检查是否为编号列表
-            elif para_text[0].isdigit() and para_text[1:3] in [". ", ") "]:
-                list_text = para_text[3:].strip()
-                doc.add_paragraph(list_text, style="List Number")
-            else:
+        for style, para_text in _classify_paragraphs(text):
+            if style is None:
                 # 普通段落
-                para.add_run(para_text)
+                doc.add_paragraph().add_run(para_text)
+            elif style in _HEADING_LEVELS:
+                doc.add_heading(para_text, _HEADING_LEVELS[style])
+            else:
+                doc.add_paragraph(para_text, style=style)
     
     def _get_current_time(self) -> str:
         """获取当前时间"""
-        from datetime import datetime
         return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
 
@@ -3,21 +3,175 @@
 AI PPT to Docx/Markdown Converter - Main module
 """
 
+import sys
+import logging
+import argparse
+from pathlib import Path
+from typing import Optional
+
+from .config import Config
+from .ppt_parser import PPTParser
+from .ai_processor import AIProcessor
+from .ocr_processor import OCRProcessor
+from .document_generator import DocumentGenerator
+from .docx_generator import DocxGenerator
+from .markdown_generator import MarkdownGenerator
+from .logging_config import get_logger, setup_logging as configure_logging
+
+logger = get_logger(__name__)
+
+
+def setup_logging(verbose: bool = False):
+    """
+    设置日志级别
+
+    Args:
+        verbose: 是否输出调试信息
+    """
+    level = logging.DEBUG if verbose else logging.INFO
+    root_logger = logging.getLogger()
+
+    if root_logger.handlers:
+        root_logger.setLevel(level)
+    else:
+        configure_logging(log_level=level)
+
+
+def run(pptx_path: str, *, format: Optional[str] = None, ai: Optional[str] = None,
+        model: Optional[str] = None, api_key: Optional[str] = None,
+        base_url: Optional[str] = None, ocr: bool = False, verbose: bool = False,
+        output: Optional[str] = None, config_file: Optional[str] = None,
+        no_ai: bool = False) -> bool:
+    """
+    转换单个PPT文件
+
+    未指定的参数使用配置文件/环境变量中的值。
+
+    Args:
+        pptx_path: PPT文件路径
+        format: 输出格式 (docx 或 markdown)
+        ai: AI服务 (ollama 或 openai)
+        model: 模型名称
+        api_key: API密钥
+        base_url: API基础URL
+        ocr: 是否启用OCR
+        verbose: 详细输出
+        output: 输出文件路径，默认与PPT文件同名
+        config_file: 配置文件路径
+        no_ai: 跳过AI处理，直接输出PPT解析内容；不启用OCR时Markdown逐页解析和写入
+
+    Returns:
+        是否转换成功
+    """
+    setup_logging(verbose)
+
+    try:
+        config = Config(config_file)
+
+        # 命令行参数覆盖配置
+        if ai:
+            config.set("ai_service", ai)
+        if model:
+            config.set("model", model)
+        if api_key:
+            config.set("api_key", api_key)
+        if base_url:
+            config.set("base_url", base_url)
+
+        ppt_path = Path(pptx_path)
+        if not ppt_path.exists():
+            logger.error(f"PPT文件不存在: {ppt_path}")
+            return False
+
+        output_format = format or config.get("output_format", "docx")
+        if output:
+            output_path = Path(output)
+        else:
+            output_path = ppt_path.with_suffix(".md" if output_format == "markdown" else ".docx")
+
+        # 解析PPT（OCR需要完整的幻灯片列表；跳过AI且不做OCR时逐页解析，不保留整个文档）
+        parser = PPTParser()
+        if no_ai and not ocr:
+            slides = parser.iter_slides(ppt_path)
+        else:
+            slides = parser.extract_text(ppt_path)
+
+        # OCR处理图像
+        if ocr:
+            ocr_processor = OCRProcessor(config.get("tesseract_path") or None,
+                                         backend=config.get("ocr_backend", "tesseract"),
+                                         lang=config.get("ocr_lang", "eng"))
+            try:
+                slides = ocr_processor.process_slides(ppt_path, slides)
+            finally:
+                ocr_processor.close()
+
+        if no_ai:
+            # 直接输出解析内容，Markdown边解析边写入
+            if output_format == "markdown":
+                MarkdownGenerator().generate(slides, output_path)
+            else:
+                DocxGenerator().generate(slides, output_path)
+        else:
+            # AI处理（同一进程内复用处理器，保留会话和缓存）
+            processed_slides = AIProcessor.get_or_create(config).process_slides(slides)
+
+            # 生成文档
+            generator = DocumentGenerator()
+            if output_format == "markdown":
+                generator.generate_markdown(processed_slides, output_path)
+            else:
+                generator.generate_docx(processed_slides, output_path)
+
+        logger.info(f"转换完成: {output_path}")
+        return True
+
+    except Exception as e:
+        logger.error(f"转换失败 {pptx_path}: {e}")
+        return False
+
+
 def main():
     """
     Main function to run the PPT converter application
     """
-    print("AI PPT to Docx/Markdown Converter")
-    print("This is the main module.")
-    # Add your actual converter logic here
-    
-    # Example functionality:
-    print("Converter is running...")
-    # You would typically have code to:
-    # 1. Parse command line arguments
-    # 2. Process PPT files
-    # 3. Convert to Docx/Markdown
-    # 4. Handle errors and logging
+    parser = argparse.ArgumentParser(description="AI PPT to Docx/Markdown Converter")
+
+    parser.add_argument("input", help="PPT文件路径")
+    parser.add_argument("-o", "--output", help="输出文件路径 (默认: 自动生成)")
+    parser.add_argument("--format", choices=["docx", "markdown"],
+                       help="输出格式 (默认: docx)")
+    parser.add_argument("--ai", choices=["ollama", "openai"],
+                       help="AI服务选择 (默认: ollama)")
+    parser.add_argument("--model", help="AI模型名称 (默认: llama2)")
+    parser.add_argument("--api-key", help="API密钥 (可选)")
+    parser.add_argument("--base-url", help="API基础URL (可选)")
+    parser.add_argument("--ocr", action="store_true",
+                       help="启用OCR处理PPT中的图像内容")
+    parser.add_argument("--no-ai", action="store_true",
+                       help="跳过AI处理，直接输出PPT解析内容")
+    parser.add_argument("--verbose", "-v", action="store_true",
+                       help="详细输出")
+    parser.add_argument("--config", help="配置文件路径")
+
+    args = parser.parse_args()
+
+    success = run(
+        args.input,
+        format=args.format,
+        ai=args.ai,
+        model=args.model,
+        api_key=args.api_key,
+        base_url=args.base_url,
+        ocr=args.ocr,
+        verbose=args.verbose,
+        output=args.output,
+        config_file=args.config,
+        no_ai=args.no_ai
+    )
+
+    sys.exit(0 if success else 1)
+
 
 if __name__ == "__main__":
     main()
@@ -3,24 +3,61 @@ OCR处理器模块
 负责处理PPT中的图像内容
 """
 
+import hashlib
+import io
 import logging
 import os
+import queue
 import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from itertools import repeat
 from pathlib import Path
-from typing import Dict, List, Any, Optional
-from dataclasses import dataclass
+from statistics import fmean
+from typing import Dict, Iterable, List, Any, Optional, Tuple
+from dataclasses import dataclass, replace
 
 from .logging_config import get_logger
+from .ppt_parser import _load_presentation, _safe_shape_type
 
 try:
     from PIL import Image
     import pytesseract
-    from pptx import Presentation
 except ImportError:
     get_logger(__name__).warning("OCR相关库未安装，OCR功能将受限")
 
+# tesserocr为可选依赖：直接调用libtesseract，语言模型只加载一次，不再为每张图像启动子进程
+try:
+    from tesserocr import PyTessBaseAPI, RIL
+except ImportError:
+    PyTessBaseAPI = None
+
+# easyocr为可选依赖：在GPU上一次前向计算识别一批图像
+try:
+    import easyocr
+except ImportError:
+    easyocr = None
+
 logger = get_logger(__name__)
 
+# 每次调用Tesseract处理的最大图像数（图像列表过长时Tesseract可能卡住）
+_OCR_BATCH_SIZE = 50
+
+# 预处理图像只是交给Tesseract读取的临时文件，用最快的PNG压缩级别减少编码和写入时间
+_OCR_PNG_COMPRESS_LEVEL = 1
+
+# easyocr使用的识别语言
+_EASYOCR_LANGS = ["ch_sim", "en"]
+
+# easyocr批量识别前统一缩放到的尺寸
+_EASYOCR_SIZE = (800, 600)
+
+
+@lru_cache(maxsize=256)
+def _contrast_table(mean: int) -> List[int]:
+    """以灰度均值为中心将对比度提高1.5倍的查找表"""
+    return [min(255, max(0, (3 * value - mean) // 2)) for value in range(256)]
+
 
 @dataclass
 class OCRResult:
@@ -34,8 +71,41 @@ class OCRResult:
 class OCRProcessor:
     """OCR处理器类"""
     
-    def __init__(self, tesseract_cmd: Optional[str] = None):
+    def __init__(self, tesseract_cmd: Optional[str] = None, max_workers: Optional[int] = None,
+                 backend: str = "tesseract", gpu: bool = True, lang: str = "eng"):
+        """
+        Args:
+            tesseract_cmd: tesseract可执行文件路径
+            max_workers: 并行识别的线程数，默认为CPU核数
+            backend: OCR后端，tesseract或easyocr；easyocr不可用时回退到Tesseract
+            gpu: easyocr是否使用GPU；CUDA不可用时回退到Tesseract
+            lang: Tesseract识别语言（tesserocr和pytesseract共用），如eng或eng+chi_sim
+        """
         self.logger = get_logger(__name__)
+        # Tesseract在子进程/C库中运行并释放GIL，线程数按CPU核数设置
+        self.max_workers = max(1, max_workers or os.cpu_count() or 1)
+        self.lang = lang
+        
+        # 优先使用常驻的tesserocr API；API实例不是线程安全的，每个线程各取一个
+        self._apis: List[Any] = []
+        self._idle_apis: "queue.SimpleQueue[Any]" = queue.SimpleQueue()
+        
+        self._reader: Any = None
+        if backend == "easyocr":
+            self._reader = self._create_easyocr_reader(gpu)
+            if self._reader is not None:
+                self.tesseract_available = True
+                return
+        
+        if PyTessBaseAPI is not None:
+            try:
+                self._release_api(self._create_api())
+            except Exception as e:
+                self.logger.warning(f"tesserocr初始化失败，使用pytesseract: {e}")
+        
+        if self._apis:
+            self.tesseract_available = True
+            return
         
         # 设置tesseract路径（如果需要）
         if tesseract_cmd:
@@ -49,6 +119,63 @@ class OCRProcessor:
             self.logger.warning(f"Tesseract OCR不可用: {e}")
             self.tesseract_available = False
     
+    def close(self):
+        """释放tesserocr API和easyocr模型占用的资源"""
+        self._reader = None
+        for api in self._apis:
+            api.End()
+        self._apis.clear()
+        self._idle_apis = queue.SimpleQueue()
+    
+    def _create_easyocr_reader(self, gpu: bool) -> Any:
+        """创建并预热easyocr识别器，不可用时返回None"""
+        if easyocr is None:
+            self.logger.warning("easyocr未安装，使用Tesseract")
+            return None
+        
+        try:
+            import numpy as np
+            import torch
+            
+            if gpu and not torch.cuda.is_available():
+                self.logger.warning("CUDA不可用，使用Tesseract")
+                return None
+            
+            reader = easyocr.Reader(_EASYOCR_LANGS, gpu=gpu)
+            
+            # 先识别一张空白图像，让CUDA内核加载和cuDNN调优不计入第一批识别
+            width, height = _EASYOCR_SIZE
+            reader.readtext_batched([np.zeros((height, width, 3), dtype=np.uint8)],
+                                    n_width=width, n_height=height)
+            return reader
+        except Exception as e:
+            self.logger.warning(f"easyocr初始化失败，使用Tesseract: {e}")
+            return None
+    
+    def _create_api(self) -> Any:
+        """创建新的tesserocr API实例"""
+        api = PyTessBaseAPI(lang=self.lang)
+        self._apis.append(api)
+        return api
+    
+    def _acquire_api(self) -> Any:
+        """取出一个空闲的API实例，没有空闲实例时新建"""
+        try:
+            return self._idle_apis.get_nowait()
+        except queue.Empty:
+            return self._create_api()
+    
+    def _release_api(self, api: Any):
+        """归还API实例"""
+        self._idle_apis.put(api)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
+    
     def process_slides(self, ppt_path: Path, slides_data: List[Any]) -> List[Any]:
         """
         处理PPT中的图像内容
@@ -66,27 +193,25 @@ class OCRProcessor:
         
         self.logger.info("开始OCR处理PPT中的图像...")
         
-        # 创建临时目录用于存储提取的图像
+        # 提取PPT中的图像（保留在内存中）
+        extracted_images = self._extract_images_from_ppt(ppt_path)
+        
+        # 相同内容的图像（如每页重复的logo、背景）只识别一次
+        unique_images: Dict[bytes, Dict[str, Any]] = {}
+        for image_info in extracted_images:
+            unique_images.setdefault(image_info["digest"], image_info)
+        
+        # 临时目录只用于pytesseract批量识别时的预处理图像和图像列表
         with tempfile.TemporaryDirectory() as temp_dir:
-            temp_path = Path(temp_dir)
-            
-            # 提取PPT中的图像
-            extracted_images = self._extract_images_from_ppt(ppt_path, temp_path)
-            
-            # 对每张图像执行OCR
-            ocr_results = {}
-            for image_info in extracted_images:
-                slide_index = image_info["slide_index"]
-                image_path = image_info["path"]
-                
-                try:
-                    result = self._perform_ocr(image_path)
-                    if result and result.text.strip():
-                        if slide_index not in ocr_results:
-                            ocr_results[slide_index] = []
-                        ocr_results[slide_index].append(result)
-                except Exception as e:
-                    self.logger.error(f"OCR处理图像失败 {image_path}: {e}")
+            # 批量执行OCR，结果与unique_images按顺序对应
+            results = self._ocr_images(list(unique_images.values()), Path(temp_dir))
+        results_by_digest = dict(zip(unique_images, results))
+        
+        ocr_results = {}
+        for image_info in extracted_images:
+            result = results_by_digest[image_info["digest"]]
+            if result and result.text.strip():
+                ocr_results.setdefault(image_info["slide_index"], []).append((image_info["shape_id"], result))
         
         # 更新幻灯片数据
         updated_slides = []
@@ -100,38 +225,33 @@ class OCRProcessor:
             else:
                 updated_slides.append(slide)
         
-        self.logger.info(f"OCR处理完成，处理了{len(ocr_results)}页幻灯片")
+        self.logger.info(f"OCR处理完成，识别了{len(unique_images)}张不同图像，处理了{len(ocr_results)}页幻灯片")
         return updated_slides
     
-    def _extract_images_from_ppt(self, ppt_path: Path, temp_dir: Path) -> List[Dict[str, Any]]:
-        """从PPT中提取图像"""
+    def _extract_images_from_ppt(self, ppt_path: Path) -> List[Dict[str, Any]]:
+        """从PPT中提取图像，图像数据以字节形式保留在内存中"""
         extracted_images = []
         
         try:
-            presentation = Presentation(ppt_path)
+            presentation = _load_presentation(ppt_path)
             
             for i, slide in enumerate(presentation.slides):
                 slide_index = i + 1
                 image_count = 0
                 
                 for shape in slide.shapes:
-                    if shape.shape_type == 13:  # MSO_SHAPE_TYPE.PICTURE
+                    if _safe_shape_type(shape) == 13:  # MSO_SHAPE_TYPE.PICTURE
                         try:
                             # 提取图像数据
                             image = shape.image
-                            image_bytes = image.blob
-                            
-                            # 保存到临时文件
                             image_ext = image.ext or "png"
-                            image_filename = f"slide_{slide_index}_img_{image_count}.{image_ext}"
-                            image_path = temp_dir / image_filename
-                            
-                            with open(image_path, "wb") as f:
-                                f.write(image_bytes)
+                            image_bytes = image.blob
                             
                             extracted_images.append({
                                 "slide_index": slide_index,
-                                "path": str(image_path),
+                                "image_name": f"slide_{slide_index}_img_{image_count}.{image_ext}",
+                                "blob": image_bytes,
+                                "digest": hashlib.sha256(image_bytes).digest(),
                                 "shape_id": shape.shape_id,
                                 "name": shape.name,
                                 "width": shape.width,
@@ -149,56 +269,245 @@ class OCRProcessor:
         self.logger.info(f"从PPT中提取了{len(extracted_images)}张图像")
         return extracted_images
     
-    def _perform_ocr(self, image_path: str) -> Optional[OCRResult]:
-        """对图像执行OCR"""
+    def _ocr_images(self, images: List[Dict[str, Any]], temp_dir: Path) -> List[Optional[OCRResult]]:
+        """
+        对多张图像执行OCR
+        
+        每批图像只启动一次Tesseract（图像列表文件），各批在线程池中并行识别，批量识别失败时回退到逐张识别。
+        
+        Args:
+            images: _extract_images_from_ppt()提取的图像信息
+            temp_dir: 存放预处理图像和图像列表的临时目录
+            
+        Returns:
+            与images按顺序对应的OCR结果
+        """
+        if not images:
+            return []
+        
+        # easyocr把图像组成批次送入GPU
+        if self._reader is not None:
+            return self._perform_easyocr_batch(images)
+        
+        # tesserocr没有子进程启动开销，直接在内存中逐张并行识别
+        if self._apis:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                return list(executor.map(self._ocr_image, images))
+        
+        # 每个tesseract子进程只用单线程，并行度由线程池控制
+        os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+        
+        # 图像平均分给各线程，每批不超过_OCR_BATCH_SIZE
+        batch_size = min(_OCR_BATCH_SIZE, -(-len(images) // self.max_workers))
+        batches = [images[start:start + batch_size] for start in range(0, len(images), batch_size)]
+        
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(batches))) as executor:
+            batch_results = list(executor.map(self._ocr_batch, batches, repeat(temp_dir)))
+        
+        return [result for results in batch_results for result in results]
+    
+    def _ocr_batch(self, images: List[Dict[str, Any]], temp_dir: Path) -> List[Optional[OCRResult]]:
+        """识别一批图像，批量识别失败时回退到逐张识别"""
+        try:
+            return self._perform_batch_ocr(images, temp_dir)
+        except Exception as e:
+            self.logger.warning(f"批量OCR失败，回退到逐张处理: {e}")
+            return [self._ocr_image(image_info) for image_info in images]
+    
+    def _ocr_image(self, image_info: Dict[str, Any]) -> Optional[OCRResult]:
+        """识别单张图像"""
+        return self._perform_ocr(image_info["image_name"], image_info["blob"])
+    
+    def _perform_batch_ocr(self, images: List[Dict[str, Any]], temp_dir: Path) -> List[Optional[OCRResult]]:
+        """
+        通过Tesseract的图像列表功能一次识别多张图像
+        
+        Raises:
+            ValueError: 识别结果的页数与图像数量不一致
+        """
+        # 预处理后的图像写入临时目录，列表文件中每行一个路径（文件名按原图区分，多批并行时互不覆盖）
+        image_names = [image_info["image_name"] for image_info in images]
+        processed_paths = []
+        for image_name, image_info in zip(image_names, images):
+            with Image.open(io.BytesIO(image_info["blob"])) as image:
+                processed_image = self._preprocess_image(image)
+            processed_path = temp_dir / f"{Path(image_name).stem}_ocr.png"
+            processed_image.save(processed_path, compress_level=_OCR_PNG_COMPRESS_LEVEL)
+            processed_paths.append(str(processed_path))
+        
+        list_file = temp_dir / f"{Path(image_names[0]).stem}_list.txt"
+        list_file.write_text("\n".join(processed_paths) + "\n", encoding="utf-8")
+        
+        ocr_data = pytesseract.image_to_data(str(list_file), lang=self.lang, output_type=pytesseract.Output.DICT)
+        
+        # 按page_num（从1开始）把识别结果分配回对应图像
+        rows_by_page: List[List[int]] = [[] for _ in images]
+        for row, page_num in enumerate(ocr_data["page_num"]):
+            if not 1 <= page_num <= len(images):
+                raise ValueError(f"OCR结果页码超出范围: {page_num}")
+            rows_by_page[page_num - 1].append(row)
+        
+        return [
+            self._build_ocr_result(image_name, ocr_data, rows)
+            for image_name, rows in zip(image_names, rows_by_page)
+        ]
+    
+    def _perform_easyocr_batch(self, images: List[Dict[str, Any]]) -> List[Optional[OCRResult]]:
+        """使用easyocr的readtext_batched成批识别图像"""
+        import numpy as np
+        
+        width, height = _EASYOCR_SIZE
+        arrays = []
+        sizes = []
+        try:
+            for image_info in images:
+                with Image.open(io.BytesIO(image_info["blob"])) as image:
+                    arrays.append(np.asarray(image.convert("RGB")))
+                    sizes.append(image.size)
+            
+            # readtext_batched先把图像缩放到同一尺寸，再组成一个批次识别；
+            # 每批不超过_OCR_BATCH_SIZE张，限制显存占用
+            batch_detections = []
+            for start in range(0, len(arrays), _OCR_BATCH_SIZE):
+                batch = arrays[start:start + _OCR_BATCH_SIZE]
+                batch_detections.extend(self._reader.readtext_batched(
+                    batch, n_width=width, n_height=height, batch_size=len(batch)
+                ))
+        except Exception as e:
+            self.logger.error(f"easyocr批量识别失败: {e}")
+            return [None] * len(images)
+        
+        return [
+            self._build_easyocr_result(image_info["image_name"], detections,
+                                       (image_width / width, image_height / height))
+            for image_info, detections, (image_width, image_height)
+            in zip(images, batch_detections, sizes)
+        ]
+    
+    def _build_easyocr_result(self, image_path: str, detections: List[Any], scale: tuple) -> Optional[OCRResult]:
+        """根据easyocr的识别结果 [(四角坐标, 文本, 置信度), ...] 构建OCR结果"""
+        texts = []
+        confidences = []
+        boxes = []
+        for box, text, confidence in detections:
+            if text.strip():
+                texts.append(text)
+                confidences.append(float(confidence) * 100)  # 与Tesseract一致，使用0-100
+                boxes.append(box)
+        
+        if not texts:
+            return None
+        
+        # 第一个文本框，坐标从统一尺寸换算回原图
+        scale_x, scale_y = scale
+        xs = [point[0] for point in boxes[0]]
+        ys = [point[1] for point in boxes[0]]
+        bounding_box = (
+            int(min(xs) * scale_x),
+            int(min(ys) * scale_y),
+            int((max(xs) - min(xs)) * scale_x),
+            int((max(ys) - min(ys)) * scale_y)
+        )
+        
+        return OCRResult(
+            image_path=image_path,
+            text=" ".join(texts),
+            confidence=sum(confidences) / len(confidences),
+            bounding_box=bounding_box
+        )
+    
+    def _perform_ocr(self, image_path: str, image_bytes: Optional[bytes] = None) -> Optional[OCRResult]:
+        """
+        对图像执行OCR
+        
+        Args:
+            image_path: 图像路径；提供image_bytes时仅作为图像名称
+            image_bytes: 内存中的图像数据，避免写入临时文件再读取
+        """
         try:
             # 打开图像
-            image = Image.open(image_path)
+            image = Image.open(io.BytesIO(image_bytes) if image_bytes is not None else image_path)
             
             # 预处理图像以提高OCR准确性
             processed_image = self._preprocess_image(image)
             
+            if self._apis:
+                return self._perform_tesserocr(image_path, processed_image)
+            
             # 执行OCR
             ocr_data = pytesseract.image_to_data(
                 processed_image, 
+                lang=self.lang,
                 output_type=pytesseract.Output.DICT
             )
             
-            # 提取文本和置信度
-            texts = []
-            confidences = []
-            bounding_boxes = []
-            
-            for i, text in enumerate(ocr_data["text"]):
-                if text.strip():
-                    texts.append(text)
-                    confidences.append(float(ocr_data["conf"][i]))
-                    bounding_boxes.append((
-                        ocr_data["left"][i],
-                        ocr_data["top"][i],
-                        ocr_data["width"][i],
-                        ocr_data["height"][i]
-                    ))
-            
-            if texts:
-                # 计算平均置信度
-                avg_confidence = sum(confidences) / len(confidences)
-                
-                # 合并文本
-                full_text = " ".join(texts)
-                
-                return OCRResult(
-                    image_path=image_path,
-                    text=full_text,
-                    confidence=avg_confidence,
-                    bounding_box=bounding_boxes[0] if bounding_boxes else (0, 0, 0, 0)
-                )
+            return self._build_ocr_result(image_path, ocr_data, range(len(ocr_data["text"])))
             
         except Exception as e:
             self.logger.error(f"OCR处理失败 {image_path}: {e}")
         
         return None
     
+    def _perform_tesserocr(self, image_path: str, image: Image.Image) -> Optional[OCRResult]:
+        """使用常驻的tesserocr API识别预处理后的图像"""
+        api = self._acquire_api()
+        try:
+            api.SetImage(image)
+            
+            # 与pytesseract路径一致：按单词以空格合并
+            full_text = " ".join(api.GetUTF8Text().split())
+            if not full_text:
+                return None
+            
+            confidences = api.AllWordConfidences()
+            
+            # 第一个单词的边界框 (left, top, width, height)
+            bounding_box = (0, 0, 0, 0)
+            iterator = api.GetIterator()
+            if iterator is not None:
+                box = iterator.BoundingBox(RIL.WORD)
+                if box:
+                    x1, y1, x2, y2 = box
+                    bounding_box = (x1, y1, x2 - x1, y2 - y1)
+        finally:
+            self._release_api(api)
+        
+        avg_confidence = sum(confidences) / len(confidences) if confidences else 0.0
+        
+        return OCRResult(
+            image_path=image_path,
+            text=full_text,
+            confidence=avg_confidence,
+            bounding_box=bounding_box
+        )
+    
+    def _build_ocr_result(self, image_path: str, ocr_data: Dict[str, List[Any]], rows: Iterable[int]) -> Optional[OCRResult]:
+        """根据image_to_data结果中属于该图像的行构建OCR结果"""
+        # 只保留有文本的行
+        texts = ocr_data["text"]
+        words = [i for i in rows if texts[i].strip()]
+        if not words:
+            return None
+        
+        # 计算平均置信度
+        conf = ocr_data["conf"]
+        avg_confidence = fmean(float(conf[i]) for i in words)
+        
+        # 只需要第一个单词的边界框
+        first = words[0]
+        
+        return OCRResult(
+            image_path=image_path,
+            text=" ".join(texts[i] for i in words),
+            confidence=avg_confidence,
+            bounding_box=(
+                ocr_data["left"][first],
+                ocr_data["top"][first],
+                ocr_data["width"][first],
+                ocr_data["height"][first]
+            )
+        )
+    
     def _preprocess_image(self, image: Image.Image) -> Image.Image:
         """预处理图像以提高OCR准确性"""
         # 转换为灰度图
@@ -213,45 +522,34 @@ class OCRProcessor:
             new_size = (int(width * scale), int(height * scale))
             image = image.resize(new_size, Image.LANCZOS)
         
-        # 增强对比度
-        from PIL import ImageEnhance
-        enhancer = ImageEnhance.Contrast(image)
-        image = enhancer.enhance(1.5)
-        
-        return image
+        # 增强对比度（等同ImageEnhance.Contrast(image).enhance(1.5)，但只需一次查表）
+        histogram = image.histogram()
+        mean = int(sum(i * count for i, count in enumerate(histogram)) / sum(histogram) + 0.5)
+        return image.point(_contrast_table(mean))
     
-    def _merge_ocr_results(self, slide: Any, ocr_results: List[OCRResult]) -> Any:
-        """将OCR结果合并到幻灯片数据中"""
-        # 创建新的幻灯片数据
-        updated_slide = type(slide)(
-            slide_index=slide.slide_index,
-            title=slide.title,
-            text_content=slide.text_content,
-            bullet_points=slide.bullet_points.copy(),
-            tables=slide.tables.copy(),
-            images=slide.images.copy(),
-            notes=slide.notes
-        )
+    def _merge_ocr_results(self, slide: Any, ocr_results: List[Tuple[int, OCRResult]]) -> Any:
+        """
+        将OCR结果合并到幻灯片数据中（返回新的幻灯片，不修改原数据）
         
+        Args:
+            slide: 原始幻灯片数据
+            ocr_results: (图像形状ID, OCR结果) 列表
+        """
         # 添加OCR结果到文本内容
-        ocr_text = "\n\n[图像OCR识别结果]:\n"
-        for i, result in enumerate(ocr_results, 1):
-            ocr_text += f"图像{i}: {result.text}\n"
-            ocr_text += f"置信度: {result.confidence:.2f}\n\n"
-        
-        # 更新文本内容
-        if updated_slide.text_content:
-            updated_slide.text_content += ocr_text
-        else:
-            updated_slide.text_content = ocr_text
-        
-        # 更新图像信息
-        for result in ocr_results:
+        parts = [slide.text_content or "", "\n\n[图像OCR识别结果]:\n"]
+        for i, (_, result) in enumerate(ocr_results, 1):
+            parts.append(f"图像{i}: {result.text}\n置信度: {result.confidence:.2f}\n\n")
+        
+        # 更新图像信息：只有找到对应图像时才复制图像列表和该图像的字典，其余字段与原幻灯片共用
+        images = slide.images
+        index_by_shape = {img.get("shape_id"): index for index, img in enumerate(images)}
+        for shape_id, result in ocr_results:
             # 查找对应的图像信息
-            for img in updated_slide.images:
-                if img.get("path", "").endswith(Path(result.image_path).name):
-                    img["ocr_text"] = result.text
-                    img["ocr_confidence"] = result.confidence
-                    break
+            index = index_by_shape.get(shape_id)
+            if index is None:
+                continue
+            if images is slide.images:
+                images = list(images)
+            images[index] = {**images[index], "ocr_text": result.text, "ocr_confidence": result.confidence}
         
-        return updated_slide
+        return replace(slide, text_content="".join(parts), images=images)
@@ -1,10 +1,11 @@
 """
 性能监控和优化工具
 """
+import logging
 import time
 import functools
 import tracemalloc
-from typing import Callable, Any, Dict
+from typing import Callable, Any, Dict, Optional, Tuple
 import psutil
 import os
 
@@ -12,6 +13,34 @@ from .logging_config import get_logger
 
 logger = get_logger(__name__)
 
+# tracemalloc会拖慢所有内存分配，只在设置ENABLE_TRACEMALLOC=1时统计峰值内存
+ENABLE_TRACEMALLOC = os.environ.get("ENABLE_TRACEMALLOC", "").lower() in ("1", "true", "yes", "on")
+
+_process: Optional[psutil.Process] = None
+
+def _get_process() -> psutil.Process:
+    """获取当前进程对象（fork后重新创建）"""
+    global _process
+    if _process is None or _process.pid != os.getpid():
+        _process = psutil.Process()
+    return _process
+
+def _start_tracing() -> bool:
+    """按需开始tracemalloc，返回是否由本次调用开启"""
+    if not ENABLE_TRACEMALLOC or tracemalloc.is_tracing():
+        return False
+    tracemalloc.start()
+    return True
+
+def _stop_tracing(started: bool) -> Optional[Tuple[int, int]]:
+    """获取当前和峰值内存，未跟踪时返回None"""
+    if not tracemalloc.is_tracing():
+        return None
+    traced = tracemalloc.get_traced_memory()
+    if started:
+        tracemalloc.stop()
+    return traced
+
 def monitor_performance(func: Callable) -> Callable:
     """
     性能监控装饰器，记录函数执行时间和内存使用
@@ -25,21 +54,20 @@ def monitor_performance(func: Callable) -> Callable:
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
         # 开始监控内存
-        tracemalloc.start()
+        tracing = _start_tracing()
         
         # 记录开始时间
-        start_time = time.time()
+        start_time = time.perf_counter()
         
         # 记录开始内存
-        process = psutil.Process(os.getpid())
+        process = _get_process()
         start_memory = process.memory_info().rss / 1024 / 1024  # MB
         
         try:
-            result = func(*args, **kwargs)
-            return result
+            return func(*args, **kwargs)
         finally:
             # 记录结束时间
-            end_time = time.time()
+            end_time = time.perf_counter()
             execution_time = end_time - start_time
             
             # 记录结束内存
@@ -47,8 +75,7 @@ def monitor_performance(func: Callable) -> Callable:
             memory_usage = end_memory - start_memory
             
             # 获取内存快照
-            current, peak = tracemalloc.get_traced_memory()
-            tracemalloc.stop()
+            current, peak = _stop_tracing(tracing) or (0, 0)
             
             # 记录性能数据
             performance_data = {
@@ -69,10 +96,8 @@ def monitor_performance(func: Callable) -> Callable:
             logger.log(log_level, 
                       f"性能监控 - {func.__name__}: "
                       f"时间={execution_time:.3f}s, "
-                      f"内存使用={memory_usage:.2f}MB, "
-                      f"峰值内存={peak/1024/1024:.2f}MB")
-            
-            return result
+                      f"内存使用={memory_usage:.2f}MB"
+                      f"{_format_peak(peak)}")
     
     return wrapper
 
@@ -83,25 +108,25 @@ class PerformanceMonitor:
         self.name = name
         self.start_time: float = 0
         self.start_memory: float = 0
-        self.process = psutil.Process(os.getpid())
+        self.process = _get_process()
+        self._tracing = False
     
     def __enter__(self):
         """进入上下文管理器"""
-        self.start_time = time.time()
+        self.start_time = time.perf_counter()
         self.start_memory = self.process.memory_info().rss / 1024 / 1024
-        tracemalloc.start()
+        self._tracing = _start_tracing()
         return self
     
     def __exit__(self, exc_type, exc_val, exc_tb):
         """退出上下文管理器"""
-        end_time = time.time()
+        end_time = time.perf_counter()
         end_memory = self.process.memory_info().rss / 1024 / 1024
         
         execution_time = end_time - self.start_time
         memory_usage = end_memory - self.start_memory
         
-        current, peak = tracemalloc.get_traced_memory()
-        tracemalloc.stop()
+        current, peak = _stop_tracing(self._tracing) or (0, 0)
         
         performance_data = {
             'monitor_name': self.name,
@@ -119,24 +144,40 @@ class PerformanceMonitor:
         logger.log(log_level,
                   f"性能监控 [{self.name}]: "
                   f"时间={execution_time:.3f}s, "
-                  f"内存使用={memory_usage:.2f}MB, "
-                  f"峰值内存={peak/1024/1024:.2f}MB")
+                  f"内存使用={memory_usage:.2f}MB"
+                  f"{_format_peak(peak)}")
         
         return False  # 不处理异常
 
-def get_system_stats() -> Dict[str, Any]:
-    """获取系统统计信息"""
-    process = psutil.Process(os.getpid())
+def _format_peak(peak: int) -> str:
+    """格式化峰值内存，未启用tracemalloc时为空"""
+    return f", 峰值内存={peak/1024/1024:.2f}MB" if peak else ""
+
+def get_system_stats(detailed: bool = False) -> Dict[str, Any]:
+    """
+    获取系统统计信息
+    
+    Args:
+        detailed: 是否统计打开的文件和网络连接数（需要逐个遍历文件描述符，开销较大）
+    """
+    process = _get_process()
     memory_info = process.memory_info()
     
-    return {
-        'cpu_percent': psutil.cpu_percent(),
+    stats = {
+        # interval=None不阻塞，返回与上次调用之间的CPU使用率
+        'cpu_percent': psutil.cpu_percent(interval=None),
         'memory_rss_mb': memory_info.rss / 1024 / 1024,
         'memory_vms_mb': memory_info.vms / 1024 / 1024,
-        'thread_count': process.num_threads(),
-        'open_files': len(process.open_files()),
-        'connections': len(process.connections())
+        'thread_count': process.num_threads()
     }
+    
+    if detailed:
+        # psutil 6.0起connections()更名为net_connections()
+        net_connections = getattr(process, 'net_connections', None) or process.connections
+        stats['open_files'] = len(process.open_files())
+        stats['connections'] = len(net_connections())
+    
+    return stats
 
 def optimize_memory_usage():
     """优化内存使用"""
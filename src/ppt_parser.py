@@ -4,8 +4,14 @@ PPT解析器模块
 """
 
 import logging
+import multiprocessing
+import os
+import re
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, List, Any, Union
+from typing import BinaryIO, Dict, Iterator, List, Any, Optional, Tuple, Union
 from dataclasses import dataclass
 
 from .logging_config import get_logger
@@ -18,6 +24,62 @@ except ImportError:
 
 logger = get_logger(__name__)
 
+# 每个解析进程至少处理的页数。每个进程都要重新解析整个PPT包（约0.18ms/页），
+# 之后OCR也要再解析一次；提取内容约1.4ms/页，spawn方式启动进程约0.25-0.5秒，
+# 页数较少时这些开销大于并行收益
+_PARALLEL_MIN_SLIDES = 512
+
+# 项目符号文本开头需要去掉的符号字符（后面必须跟空白，"-5"、"*args"等保持原样）
+_BULLET_GLYPH_RE = re.compile(r"[•→➢➤]\s+")
+
+# presentation.xml中幻灯片列表的条目（不匹配sldIdLst本身）
+_SLIDE_ID_RE = re.compile(rb"<(?:\w+:)?sldId\b")
+
+
+def _count_slides(path: Path) -> int:
+    """从presentation.xml统计幻灯片数量，不解析整个PPT"""
+    with zipfile.ZipFile(path) as archive:
+        return len(_SLIDE_ID_RE.findall(archive.read("ppt/presentation.xml")))
+
+
+def _available_cpus() -> int:
+    """当前进程可用的CPU核数（考虑CPU亲和性限制）"""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def _load_presentation(source: Union[str, Path, BinaryIO]) -> Any:
+    """
+    打开PPT文件
+    
+    同一文件（路径、修改时间和大小均未变化）只解析一次，PPT解析和OCR共用同一个Presentation。
+    
+    Args:
+        source: PPT文件路径，或内存中的PPT文件对象（如BytesIO，不缓存）
+    """
+    if not isinstance(source, (str, Path)):
+        return Presentation(source)
+    
+    path = Path(source).resolve()
+    stat = path.stat()
+    return _open_presentation(str(path), stat.st_mtime_ns, stat.st_size)
+
+
+# 每个缓存的Presentation都持有整个PPT的内容，只保留最近使用的少量文件
+@lru_cache(maxsize=4)
+def _open_presentation(path: str, mtime_ns: int, size: int) -> Any:
+    """解析PPT文件，修改时间和大小作为缓存键的一部分，文件变化后重新解析"""
+    return Presentation(path)
+
+
+def _safe_shape_type(shape) -> Any:
+    """获取形状类型，python-pptx无法识别的形状返回None而不是抛出NotImplementedError"""
+    try:
+        return shape.shape_type
+    except NotImplementedError:
+        return None
+
 
 @dataclass
 class SlideContent:
@@ -34,82 +96,172 @@ class SlideContent:
 class PPTParser:
     """PPT解析器类"""
     
+    # 视为项目符号的行首字符
+    _BULLET_PREFIXES = ("•", "-", "*", "→", "➢", "➤")
+    
     def __init__(self):
         self.logger = get_logger(__name__)
     
-    def extract_text(self, ppt_path: Union[str, Path]) -> List[SlideContent]:
+    def extract_text(self, ppt_path: Union[str, Path, BinaryIO]) -> List[SlideContent]:
         """
         从PPT文件中提取文本内容
         
         Args:
-            ppt_path: PPT文件路径
+            ppt_path: PPT文件路径，或内存中的PPT文件对象（如BytesIO）
             
         Returns:
             包含每页幻灯片内容的列表
         """
-        ppt_path = Path(ppt_path)
-        if not ppt_path.exists():
-            raise FileNotFoundError(f"PPT文件不存在: {ppt_path}")
-        
-        self.logger.info(f"开始解析PPT文件: {ppt_path}")
+        ppt_path = self._check_path(ppt_path)
         
         try:
             # 尝试使用python-pptx库解析
-            return self._extract_with_pptx(ppt_path)
+            return list(self._extract_with_pptx(ppt_path))
         except Exception as e:
             self.logger.warning(f"使用python-pptx解析失败: {e}")
             # 回退到基本文本提取
             return self._extract_basic_text(ppt_path)
     
-    def _extract_with_pptx(self, ppt_path: Path) -> List[SlideContent]:
-        """使用python-pptx库提取内容"""
-        presentation = Presentation(ppt_path)
-        slides_data = []
+    def iter_slides(self, ppt_path: Union[str, Path, BinaryIO]) -> Iterator[SlideContent]:
+        """
+        逐页提取PPT内容，不在内存中保留整个文档的解析结果
         
-        for i, slide in enumerate(presentation.slides):
-            self.logger.debug(f"处理第{i+1}页幻灯片")
-            
-            # 提取标题
-            title = self._extract_slide_title(slide)
-            
-            # 提取文本内容
-            text_content, bullet_points = self._extract_text_content(slide)
-            
-            # 提取表格
-            tables = self._extract_tables(slide)
-            
-            # 提取图片信息
-            images = self._extract_images(slide)
-            
-            # 提取备注
-            notes = self._extract_notes(slide)
-            
-            slide_content = SlideContent(
-                slide_index=i + 1,
-                title=title,
-                text_content=text_content,
-                bullet_points=bullet_points,
-                tables=tables,
-                images=images,
-                notes=notes
-            )
+        只有在第一页解析失败时才回退到基本文本提取，之后的错误直接抛出。
+        
+        Args:
+            ppt_path: PPT文件路径，或内存中的PPT文件对象（如BytesIO）
             
-            slides_data.append(slide_content)
+        Returns:
+            逐页产生幻灯片内容的迭代器
+        """
+        ppt_path = self._check_path(ppt_path)
+        return self._stream_slides(ppt_path)
+    
+    def _check_path(self, ppt_path: Union[str, Path, BinaryIO]) -> Union[Path, BinaryIO]:
+        """检查PPT文件是否存在，文件对象原样返回"""
+        if not isinstance(ppt_path, (str, Path)):
+            self.logger.info("开始解析内存中的PPT文件")
+            return ppt_path
+        
+        ppt_path = Path(ppt_path)
+        if not ppt_path.exists():
+            raise FileNotFoundError(f"PPT文件不存在: {ppt_path}")
+        
+        self.logger.info(f"开始解析PPT文件: {ppt_path}")
+        return ppt_path
+    
+    def _stream_slides(self, ppt_path: Union[Path, BinaryIO]) -> Iterator[SlideContent]:
+        """逐页产生幻灯片内容，第一页失败时回退到基本文本提取"""
+        slides = self._extract_with_pptx(ppt_path)
+        try:
+            first_slide = next(slides, None)
+        except Exception as e:
+            self.logger.warning(f"使用python-pptx解析失败: {e}")
+            yield from self._extract_basic_text(ppt_path)
+            return
+        
+        if first_slide is not None:
+            yield first_slide
+            yield from slides
+    
+    def _extract_with_pptx(self, ppt_path: Union[Path, BinaryIO]) -> Iterator[SlideContent]:
+        """使用python-pptx库逐页提取内容"""
+        workers, slide_total = self._parallel_workers(ppt_path)
+        
+        if workers > 1:
+            # 大文档按页分段，由多个进程并行解析，当前进程不再解析整个PPT
+            slides = self._extract_in_processes(ppt_path, slide_total, workers)
+        else:
+            presentation = _load_presentation(ppt_path)
+            slides = (self._extract_slide(slide, i + 1) for i, slide in enumerate(presentation.slides))
+        
+        slide_count = 0
+        for slide_content in slides:
+            slide_count += 1
+            yield slide_content
+        
+        self.logger.info(f"成功提取{slide_count}页幻灯片内容")
+    
+    def _parallel_workers(self, ppt_path: Union[Path, BinaryIO]) -> Tuple[int, int]:
+        """
+        解析使用的进程数
+        
+        内存中的PPT无法交给解析进程自行打开；已经在子进程中（如批量转换的进程池）时
+        不再创建进程池，避免进程数超过CPU核数。
+        
+        Returns:
+            (进程数, 幻灯片数)；单进程解析时不统计幻灯片数，返回0
+        """
+        if not isinstance(ppt_path, Path) or multiprocessing.parent_process() is not None:
+            return 1, 0
+        
+        cpus = _available_cpus()
+        if cpus == 1:
+            return 1, 0
         
-        self.logger.info(f"成功提取{len(slides_data)}页幻灯片内容")
-        return slides_data
+        try:
+            slide_total = _count_slides(ppt_path)
+        except (OSError, KeyError, zipfile.BadZipFile):
+            # 无法统计时按单进程解析，由python-pptx报告具体错误
+            return 1, 0
+        return min(cpus, -(-slide_total // _PARALLEL_MIN_SLIDES)), slide_total
     
-    def _extract_basic_text(self, ppt_path: Path) -> List[SlideContent]:
+    def _extract_in_processes(self, ppt_path: Path, slide_total: int, workers: int) -> Iterator[SlideContent]:
+        """多进程解析幻灯片，每个进程自行打开PPT文件并解析连续的一段页面"""
+        chunk_size = -(-slide_total // workers)
+        ranges = [
+            (str(ppt_path), start, min(start + chunk_size, slide_total))
+            for start in range(0, slide_total, chunk_size)
+        ]
+        
+        with ProcessPoolExecutor(max_workers=len(ranges)) as executor:
+            # map按提交顺序返回结果，保持页面顺序
+            for chunk in executor.map(_extract_slide_range, ranges):
+                yield from chunk
+    
+    def _extract_slide(self, slide, slide_index: int) -> SlideContent:
+        """提取单页幻灯片内容"""
+        self.logger.debug(f"处理第{slide_index}页幻灯片")
+        
+        # 提取标题
+        title = self._extract_slide_title(slide)
+        
+        # 提取文本内容
+        text_content, bullet_points = self._extract_text_content(slide)
+        
+        # 提取表格
+        tables = self._extract_tables(slide)
+        
+        # 提取图片信息
+        images = self._extract_images(slide)
+        
+        # 提取备注
+        notes = self._extract_notes(slide)
+        
+        return SlideContent(
+            slide_index=slide_index,
+            title=title,
+            text_content=text_content,
+            bullet_points=bullet_points,
+            tables=tables,
+            images=images,
+            notes=notes
+        )
+    
+    def _extract_basic_text(self, ppt_path: Union[Path, BinaryIO]) -> List[SlideContent]:
         """基本文本提取（当python-pptx不可用时）"""
         self.logger.warning("使用基本文本提取模式，功能受限")
         
+        # 文件对象可能没有名称（如BytesIO）
+        name = Path(getattr(ppt_path, "name", "") or "内存文件").name
+        
         # 这里可以添加其他PPT解析库的支持，如comtypes等
         # 目前返回一个占位符
         return [
             SlideContent(
                 slide_index=1,
                 title="PPT内容",
-                text_content=f"PPT文件: {ppt_path.name}\n\n无法使用高级解析功能，请安装python-pptx库。",
+                text_content=f"PPT文件: {name}\n\n无法使用高级解析功能，请安装python-pptx库。",
                 bullet_points=[],
                 tables=[],
                 images=[],
@@ -131,14 +283,17 @@ class PPTParser:
     
     def _extract_text_content(self, slide) -> tuple[str, List[str]]:
         """提取文本内容和项目符号"""
-        text_content = ""
+        text_lines = []
         bullet_points = []
         
+        # slide.shapes.title每次访问都要遍历所有形状，只取一次
+        title_shape = slide.shapes.title
+        
         for shape in slide.shapes:
             if not shape.has_text_frame:
                 continue
                 
-            if shape == slide.shapes.title:
+            if shape == title_shape:
                 continue  # 标题已单独处理
             
             text_frame = shape.text_frame
@@ -147,31 +302,38 @@ class PPTParser:
                 if not para_text:
                     continue
                 
-                # 检查是否为项目符号
-                if paragraph.level > 0 or self._is_bullet_point(paragraph):
-                    bullet_points.append(para_text)
+                # 检查是否为项目符号（去掉文本开头的项目符号字符）
+                if paragraph.level > 0 or self._is_bullet_point(paragraph, para_text):
+                    match = _BULLET_GLYPH_RE.match(para_text)
+                    bullet_points.append(para_text[match.end():] if match else para_text)
                 else:
-                    text_content += para_text + "\n"
+                    text_lines.append(para_text)
         
-        return text_content.strip(), bullet_points
+        return "\n".join(text_lines), bullet_points
     
-    def _is_bullet_point(self, paragraph) -> bool:
-        """检查段落是否为项目符号"""
+    def _is_bullet_point(self, paragraph, text: Optional[str] = None) -> bool:
+        """
+        检查段落是否为项目符号
+        
+        Args:
+            paragraph: 段落
+            text: 已去除首尾空白的段落文本，避免重复读取paragraph.text
+        """
         # 检查段落是否有项目符号
         if paragraph.paragraph_format.bullet:
             return True
         
         # 检查文本是否以项目符号开头
-        text = paragraph.text.strip()
-        bullet_indicators = ["•", "-", "*", "→", "➢", "➤"]
-        return any(text.startswith(indicator) for indicator in bullet_indicators)
+        if text is None:
+            text = paragraph.text.strip()
+        return text.startswith(self._BULLET_PREFIXES)
     
     def _extract_tables(self, slide) -> List[Dict[str, Any]]:
         """提取表格内容"""
         tables = []
         
         for shape in slide.shapes:
-            if shape.shape_type == MSO_SHAPE_TYPE.TABLE:
+            if _safe_shape_type(shape) == MSO_SHAPE_TYPE.TABLE:
                 table_data = []
                 for row in shape.table.rows:
                     row_data = []
@@ -192,7 +354,7 @@ class PPTParser:
         images = []
         
         for shape in slide.shapes:
-            if shape.shape_type == MSO_SHAPE_TYPE.PICTURE:
+            if _safe_shape_type(shape) == MSO_SHAPE_TYPE.PICTURE:
                 images.append({
                     "shape_id": shape.shape_id,
                     "name": shape.name,
@@ -209,3 +371,11 @@ class PPTParser:
         if slide.has_notes_slide and slide.notes_slide.notes_text_frame:
             return slide.notes_slide.notes_text_frame.text.strip()
         return ""
+
+
+def _extract_slide_range(args: Tuple[str, int, int]) -> List[SlideContent]:
+    """在子进程中解析PPT的[start, stop)页"""
+    ppt_path, start, stop = args
+    parser = PPTParser()
+    slides = _load_presentation(ppt_path).slides
+    return [parser._extract_slide(slides[i], i + 1) for i in range(start, stop)]
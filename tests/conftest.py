@@ -0,0 +1,132 @@
+"""
+测试公共夹具
+"""
+
+import copy
+import io
+import json
+import os
+from functools import lru_cache
+from types import MappingProxyType
+
+import pytest
+import requests
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+
+from src.config import Config
+
+
+# 测试默认使用的AI服务配置
+_TEST_SERVICE_CONFIG = {
+    "ai_service": "ollama",
+    "model": "llama2",
+    "base_url": "http://localhost:11434",
+    "api_key": "",
+}
+
+
+@lru_cache(maxsize=1)
+def _cached_env_snapshot():
+    """解析base_config时的环境变量"""
+    return dict(os.environ)
+
+
+@pytest.fixture(scope="session")
+def base_config():
+    """整个测试会话共用的配置，环境变量和配置文件只解析一次"""
+    _cached_env_snapshot()
+    return Config()
+
+
+@pytest.fixture(scope="session")
+def shared_tmp(tmp_path_factory):
+    """整个测试会话共用的临时目录，只读或文件名不冲突的测试无需各自创建临时目录"""
+    return tmp_path_factory.mktemp("aptdom")
+
+
+@pytest.fixture
+def config_factory(base_config):
+    """创建互不影响的配置：复制base_config已加载的配置项，不重新解析环境变量和配置文件"""
+    def factory(**overrides):
+        # 测试修改过环境变量时复制的配置已过期，此时重新解析
+        source = base_config if dict(os.environ) == _cached_env_snapshot() else Config()
+        config = copy.copy(source)
+        config._config = {**source._config, **overrides}
+        config._config_view = MappingProxyType(config._config)
+        return config
+    
+    return factory
+
+
+@pytest.fixture
+def config(config_factory):
+    """每个测试独立的配置，AI服务固定为本地Ollama"""
+    return config_factory(**_TEST_SERVICE_CONFIG)
+
+
+class FakeTransport(BaseAdapter):
+    """传输层模拟：按(方法, URL)返回预先注册的响应，未注册的请求视为连接失败"""
+    
+    def __init__(self):
+        super().__init__()
+        self._routes = {}
+        self.request_history = []
+    
+    def reset(self):
+        """清空注册的响应和请求记录"""
+        self._routes.clear()
+        self.request_history.clear()
+    
+    def register(self, method, url, *, status_code=200, json_body=None, body=b"", headers=None):
+        """注册响应；json_body会被序列化为UTF-8编码的请求体"""
+        if json_body is not None:
+            body = json.dumps(json_body, ensure_ascii=False)
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        self._routes[(method, url)] = (status_code, body, headers or {})
+    
+    def get(self, url, **kwargs):
+        self.register("GET", url, **kwargs)
+    
+    def post(self, url, **kwargs):
+        self.register("POST", url, **kwargs)
+    
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        # 与requests-mock一致，在请求记录上附带stream/timeout参数
+        request.stream = stream
+        request.timeout = timeout
+        self.request_history.append(request)
+        
+        route = self._routes.get((request.method, request.url))
+        if route is None:
+            raise requests.ConnectionError(f"未注册的请求: {request.method} {request.url}", request=request)
+        
+        status_code, body, headers = route
+        response = requests.Response()
+        response.status_code = status_code
+        response.headers = CaseInsensitiveDict(headers)
+        response.encoding = "utf-8"
+        response.raw = io.BytesIO(body)
+        response.url = request.url
+        response.request = request
+        return response
+    
+    def close(self):
+        pass
+
+
+@pytest.fixture(scope="session")
+def _http_transport():
+    """整个测试会话只安装一次传输层模拟，所有requests.Session都经由它发送请求"""
+    transport = FakeTransport()
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(requests.Session, "get_adapter", lambda session, url: transport)
+        yield transport
+
+
+@pytest.fixture(autouse=True)
+def http_mock(_http_transport):
+    """每个测试从空的响应表开始，按需注册URL对应的响应"""
+    _http_transport.reset()
+    return _http_transport
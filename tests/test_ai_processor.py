@@ -2,54 +2,89 @@
 AI处理器测试
 """
 
-import unittest
+import logging
+from dataclasses import dataclass, replace
 from unittest.mock import patch, MagicMock
 import json
+import tempfile
+from pathlib import Path
 
-from src.ai_processor import AIProcessor, ProcessedSlide
-from src.config import Config
+import pytest
+import requests
 
+from src.ai_processor import AIProcessor, ProcessedSlide, _slide_prompt
 
-class TestAIProcessor(unittest.TestCase):
+
+@dataclass(frozen=True)
+class _FakeSlide:
+    """只读的测试幻灯片，模块内所有测试共用同一个实例"""
+    slide_index: int = 1
+    title: str = "测试幻灯片"
+    text_content: str = "这是测试内容"
+    bullet_points: tuple = ("要点1", "要点2")
+    tables: tuple = ()
+    images: tuple = ()
+    notes: str = "备注内容"
+
+
+_SLIDE = _FakeSlide()
+
+# 模拟的AI响应及其解析结果
+_AI_JSON = '{"content": "处理后的内容", "summary": "摘要", "key_points": ["点1", "点2"], "tags": ["标签1"]}'
+_AI_PARSED = json.loads(_AI_JSON)
+
+
+class TestAIProcessor:
     """AI处理器测试类"""
     
-    def setUp(self):
+    @pytest.fixture(autouse=True)
+    def setup(self, config):
         """测试前准备"""
-        self.config = Config()
-        self.config.set("ai_service", "ollama")
-        self.config.set("model", "llama2")
-        self.config.set("base_url", "http://localhost:11434")
-        self.config.set("api_key", "")
+        self.config = config
         
         self.processor = AIProcessor(self.config)
         
-        # 创建测试幻灯片数据
-        self.test_slide = MagicMock()
-        self.test_slide.slide_index = 1
-        self.test_slide.title = "测试幻灯片"
-        self.test_slide.text_content = "这是测试内容"
-        self.test_slide.bullet_points = ["要点1", "要点2"]
-        self.test_slide.tables = []
-        self.test_slide.images = []
-        self.test_slide.notes = "备注内容"
+        # 测试幻灯片数据
+        self.test_slide = _SLIDE
     
     def test_init(self):
         """测试初始化"""
-        self.assertEqual(self.processor.ai_service, "ollama")
-        self.assertEqual(self.processor.model, "llama2")
-        self.assertEqual(self.processor.base_url, "http://localhost:11434")
-        self.assertEqual(self.processor.api_key, "")
+        assert self.processor.ai_service == "ollama"
+        assert self.processor.model == "llama2"
+        assert self.processor.base_url == "http://localhost:11434"
+        assert self.processor.api_key == ""
     
-    def test_validate_config_ollama(self):
-        """测试Ollama配置验证"""
-        with patch('requests.get') as mock_get:
-            mock_get.return_value.status_code = 200
-            mock_get.return_value.json.return_value = {"models": []}
+    def test_get_or_create(self):
+        """测试相同服务配置复用同一实例"""
+        with patch.dict(AIProcessor._instances, clear=True):
+            processor1 = AIProcessor.get_or_create(self.config)
+            processor2 = AIProcessor.get_or_create(self.config)
+            assert processor1 is processor2
             
-            # 不应该抛出异常
+            self.config.set("model", "mistral")
+            processor3 = AIProcessor.get_or_create(self.config)
+            assert processor1 is not processor3
+            assert processor3.model == "mistral"
+    
+    def test_validate_config_ollama(self, http_mock):
+        """测试Ollama配置验证"""
+        http_mock.get("http://localhost:11434/api/tags", json_body={"models": []})
+        
+        # 不应该抛出异常
+        self.processor._validate_config()
+    
+    def test_validate_config_ollama_cached(self, http_mock):
+        """测试Ollama可用性探测结果在进程内复用"""
+        http_mock.get("http://localhost:11434/api/tags", json_body={"models": []})
+        
+        with patch('src.ai_processor._VALIDATED_OLLAMA', set()):
+            self.processor._validate_config()
             self.processor._validate_config()
+        
+        assert len(http_mock.request_history) == 1
+        assert http_mock.request_history[0].timeout == 2
     
-    def test_validate_config_openai(self):
+    def test_validate_config_openai(self, caplog):
         """测试OpenAI配置验证"""
         self.config.set("ai_service", "openai")
         self.config.set("api_key", "test_key")
@@ -62,76 +97,150 @@ class TestAIProcessor(unittest.TestCase):
         self.config.set("api_key", "")
         self.processor = AIProcessor(self.config)
         
-        with self.assertLogs(level='WARNING') as log:
+        with caplog.at_level(logging.WARNING):
             self.processor._validate_config()
-            self.assertIn("OpenAI服务需要API密钥", log.output[0])
+        assert "OpenAI服务需要API密钥" in caplog.text
     
     def test_build_prompt(self):
         """测试构建提示"""
         prompt = self.processor._build_prompt(self.test_slide)
         
-        self.assertIn("测试幻灯片", prompt)
-        self.assertIn("这是测试内容", prompt)
-        self.assertIn("要点1", prompt)
-        self.assertIn("要点2", prompt)
-        self.assertIn("备注内容", prompt)
-        self.assertIn("JSON格式", prompt)
+        assert "测试幻灯片" in prompt
+        assert "这是测试内容" in prompt
+        assert "要点1" in prompt
+        assert "要点2" in prompt
+        assert "备注内容" in prompt
+        assert "JSON格式" in prompt
     
-    @patch('requests.post')
-    def test_call_ollama_api(self, mock_post):
+    def test_build_prompt_cached(self):
+        """测试相同内容的幻灯片复用已构建的提示"""
+        _slide_prompt.cache_clear()
+        
+        first = self.processor._build_prompt(self.test_slide)
+        self.processor._build_batch_prompt([self.test_slide])
+        second = self.processor._build_prompt(self.test_slide)
+        
+        assert first == second
+        assert _slide_prompt.cache_info().misses == 1
+        assert _slide_prompt.cache_info().hits == 2
+    
+    def test_call_ollama_api(self, http_mock):
         """测试调用Ollama API"""
-        mock_response = MagicMock()
-        mock_response.status_code = 200
-        mock_response.json.return_value = {
-            "response": '{"content": "处理后的内容", "summary": "摘要", "key_points": ["点1", "点2"], "tags": ["标签1"]}'
-        }
-        mock_post.return_value = mock_response
+        # 响应分两段流式返回
+        split = _AI_JSON.index('"key_points"')
+        http_mock.post("http://localhost:11434/api/generate", body=b"\n".join([
+            json.dumps({"response": _AI_JSON[:split], "done": False}).encode("utf-8"),
+            b"",
+            json.dumps({"response": _AI_JSON[split:], "done": True}).encode("utf-8"),
+        ]))
         
-        result = self.processor._call_ollama_api("测试提示")
+        with patch.object(requests.Response, 'close', autospec=True) as mock_close:
+            result = self.processor._call_ollama_api("测试提示")
         
-        self.assertEqual(result, '{"content": "处理后的内容", "summary": "摘要", "key_points": ["点1", "点2"], "tags": ["标签1"]}')
-        mock_post.assert_called_once()
+        assert result == _AI_JSON
+        assert len(http_mock.request_history) == 1
+        assert http_mock.request_history[0].stream
+        mock_close.assert_called_once()
     
-    @patch('requests.post')
-    def test_call_openai_api(self, mock_post):
+    def test_call_ollama_api_stream_error(self, http_mock):
+        """测试Ollama流式响应中的错误"""
+        http_mock.post("http://localhost:11434/api/generate", body=b'{"error": "model not found"}')
+        
+        with pytest.raises(Exception, match="model not found"):
+            self.processor._call_ollama_api("测试提示")
+    
+    def test_call_openai_api(self, http_mock):
         """测试调用OpenAI API"""
         self.config.set("ai_service", "openai")
         self.config.set("api_key", "test_key")
+        self.config.set("base_url", "https://api.openai.com/v1")
         self.processor = AIProcessor(self.config)
         
-        mock_response = MagicMock()
-        mock_response.status_code = 200
-        mock_response.json.return_value = {
+        http_mock.post("https://api.openai.com/v1/chat/completions", json_body={
             "choices": [
                 {
                     "message": {
-                        "content": '{"content": "处理后的内容", "summary": "摘要", "key_points": ["点1", "点2"], "tags": ["标签1"]}'
+                        "content": _AI_JSON
                     }
                 }
             ]
-        }
-        mock_post.return_value = mock_response
+        })
         
         result = self.processor._call_openai_api("测试提示")
         
-        self.assertEqual(result, '{"content": "处理后的内容", "summary": "摘要", "key_points": ["点1", "点2"], "tags": ["标签1"]}')
-        mock_post.assert_called_once()
+        assert result == _AI_JSON
+        assert len(http_mock.request_history) == 1
+        
+        # 请求体为UTF-8编码的JSON，中文不做\uXXXX转义
+        body = http_mock.request_history[0].body
+        assert "测试提示".encode("utf-8") in body
+        payload = json.loads(body)
+        assert payload["model"] == self.processor.model
+        assert payload["max_tokens"] == self.processor.max_tokens
+        assert payload["temperature"] == self.processor.temperature
+    
+    def test_process_batch_scales_output_budget(self, http_mock):
+        """测试批量调用的输出token上限按页数放大，使用配置的max_tokens和temperature"""
+        self.config.set("max_tokens", 1000)
+        self.config.set("temperature", 0.5)
+        self.config.set("cache", "off")
+        self.processor = AIProcessor(self.config)
+        
+        slides = [_SLIDE, replace(_SLIDE, slide_index=2)]
+        batch_json = json.dumps([_AI_PARSED, _AI_PARSED], ensure_ascii=False)
+        http_mock.post("http://localhost:11434/api/generate",
+                       json_body={"response": batch_json, "done": True})
+        
+        result = self.processor._process_batch(slides)
+        
+        assert [slide.slide_index for slide in result] == [1, 2]
+        options = json.loads(http_mock.request_history[-1].body)["options"]
+        assert options == {"num_predict": 2000, "temperature": 0.5}
+    
+    def test_session_retry_policy(self):
+        """测试读取超时和429不在适配器层重试，429只由处理器按Retry-After退避"""
+        retry = self.processor.session.adapters["https://"].max_retries
+        
+        assert retry.read == 0
+        assert 429 not in retry.status_forcelist
+        assert not retry.respect_retry_after_header
+    
+    def test_call_openai_api_rate_limited(self, http_mock):
+        """测试429响应后按Retry-After暂停后续调用"""
+        self.config.set("ai_service", "openai")
+        self.config.set("api_key", "test_key")
+        self.config.set("base_url", "https://api.openai.com/v1")
+        self.config.set("cache", "off")
+        self.processor = AIProcessor(self.config)
+        
+        url = "https://api.openai.com/v1/chat/completions"
+        http_mock.post(url, status_code=429, headers={"Retry-After": "2"})
+        
+        with pytest.raises(Exception):
+            self.processor._call_ai_api("测试提示")
+        
+        http_mock.post(url, json_body={"choices": [{"message": {"content": "结果"}}]})
+        
+        with patch('src.ai_processor.time.sleep') as mock_sleep:
+            result = self.processor._call_ai_api("测试提示")
+        
+        assert result == "结果"
+        mock_sleep.assert_called_once()
+        assert abs(mock_sleep.call_args.args[0] - 2) <= 0.5
     
     def test_parse_ai_response_json(self):
         """测试解析JSON格式的AI响应"""
-        ai_response = '{"content": "处理后的内容", "summary": "摘要", "key_points": ["点1", "点2"], "tags": ["标签1"]}'
-        
-        result = self.processor._parse_ai_response(self.test_slide, ai_response)
+        result = self.processor._parse_ai_response(self.test_slide, _AI_JSON)
         
-        self.assertIsInstance(result, ProcessedSlide)
-        self.assertEqual(result.slide_index, 1)
-        self.assertEqual(result.title, "测试幻灯片")
-        self.assertEqual(result.content, "处理后的内容")
-        self.assertEqual(result.summary, "摘要")
-        self.assertEqual(result.key_points, ["点1", "点2"])
-        self.assertEqual(result.tags, ["标签1"])
-        self.assertEqual(result.metadata["ai_service"], "ollama")
-        self.assertEqual(result.metadata["model"], "llama2")
+        assert isinstance(result, ProcessedSlide)
+        assert result.slide_index == 1
+        assert result.title == "测试幻灯片"
+        assert result.content == _AI_PARSED["content"]
+        assert result.summary == _AI_PARSED["summary"]
+        assert result.key_points == _AI_PARSED["key_points"]
+        assert result.tags == _AI_PARSED["tags"]
+        assert result.metadata["ai_service"] == "ollama"
+        assert result.metadata["model"] == "llama2"
     
     def test_parse_ai_response_text(self):
         """测试解析文本格式的AI响应"""
@@ -139,13 +248,42 @@ class TestAIProcessor(unittest.TestCase):
         
         result = self.processor._parse_ai_response(self.test_slide, ai_response)
         
-        self.assertIsInstance(result, ProcessedSlide)
-        self.assertEqual(result.slide_index, 1)
-        self.assertEqual(result.title, "测试幻灯片")
-        self.assertEqual(result.content, ai_response)
-        self.assertEqual(result.summary, "AI处理完成，但解析失败")
-        self.assertEqual(result.key_points, ["要点1", "要点2"])  # 原始数据
-        self.assertEqual(result.tags, [])
+        assert isinstance(result, ProcessedSlide)
+        assert result.slide_index == 1
+        assert result.title == "测试幻灯片"
+        assert result.content == ai_response
+        assert result.summary == "AI处理完成，但解析失败"
+        assert result.key_points == ("要点1", "要点2")  # 原始数据
+        assert result.tags == []
+    
+    def test_parse_ai_response_large(self):
+        """测试解析超长JSON响应"""
+        points = [f"要点{i}" for i in range(300)]
+        ai_response = json.dumps({
+            "content": "长内容" * 1000,
+            "summary": "摘要",
+            "key_points": points,
+            "extra": {"key_points": ["忽略"]}
+        }, ensure_ascii=False)
+        
+        result = self.processor._parse_ai_response(self.test_slide, ai_response)
+        
+        assert result.content == "长内容" * 1000
+        assert result.summary == "摘要"
+        assert result.key_points == points
+        assert result.tags == []
+        assert "parse_error" not in result.metadata
+    
+    def test_parse_ai_response_failure_metadata(self):
+        """测试解析失败时只保留响应开头"""
+        ai_response = "无效响应" * 500
+        
+        with patch.object(self.processor.logger, 'isEnabledFor', return_value=False):
+            result = self.processor._parse_ai_response(self.test_slide, ai_response)
+        
+        assert result.metadata["ai_response_head"] == ai_response[:512]
+        assert result.metadata["ai_response_len"] == len(ai_response)
+        assert "ai_response" not in result.metadata
     
     def test_extract_json(self):
         """测试提取JSON"""
@@ -169,26 +307,170 @@ class TestAIProcessor(unittest.TestCase):
             "tags": ["标签1"]
         }"""
         
-        self.assertEqual(result, expected)
+        assert result == expected
     
-    @patch.object(AIProcessor, '_call_ai_api')
-    def test_process_slides(self, mock_call_ai):
+    def test_extract_json_fenced(self):
+        """测试提取```json代码块中的JSON"""
+        text = '以下是分析结果:\n```json\n{"content": {"nested": "值"}}\n```\n如需调整请告知 {格式}'
+        
+        result = self.processor._extract_json(text)
+        
+        assert result == '{"content": {"nested": "值"}}'
+    
+    def test_process_slides(self):
         """测试处理幻灯片"""
-        mock_call_ai.return_value = '{"content": "处理后的内容", "summary": "摘要", "key_points": ["点1", "点2"], "tags": ["标签1"]}'
+        mock_call_ai = self.processor._call_ai_api = MagicMock(return_value=_AI_JSON)
         
         slides_data = [self.test_slide]
         result = self.processor.process_slides(slides_data)
         
-        self.assertEqual(len(result), 1)
-        self.assertEqual(result[0].slide_index, 1)
-        self.assertEqual(result[0].title, "测试幻灯片")
-        self.assertEqual(result[0].content, "处理后的内容")
-        self.assertEqual(result[0].summary, "摘要")
-        self.assertEqual(result[0].key_points, ["点1", "点2"])
-        self.assertEqual(result[0].tags, ["标签1"])
+        assert len(result) == 1
+        assert result[0].slide_index == 1
+        assert result[0].title == "测试幻灯片"
+        assert result[0].content == _AI_PARSED["content"]
+        assert result[0].summary == _AI_PARSED["summary"]
+        assert result[0].key_points == _AI_PARSED["key_points"]
+        assert result[0].tags == _AI_PARSED["tags"]
         
         mock_call_ai.assert_called_once()
-
-
-if __name__ == "__main__":
-    unittest.main()
+    
+    def test_process_slides_batch(self):
+        """测试批量处理幻灯片"""
+        mock_call_ai = self.processor._call_ai_api = MagicMock()
+        mock_call_ai.return_value = '[{"content": "内容1", "summary": "摘要1", "key_points": ["点1"], "tags": []}, {"content": "内容2", "summary": "摘要2", "key_points": ["点2"], "tags": []}]'
+        
+        second_slide = MagicMock()
+        second_slide.slide_index = 2
+        second_slide.title = "第二页"
+        second_slide.text_content = "第二页内容"
+        second_slide.bullet_points = []
+        second_slide.tables = []
+        second_slide.notes = ""
+        
+        result = self.processor.process_slides([self.test_slide, second_slide])
+        
+        assert [slide.slide_index for slide in result] == [1, 2]
+        assert result[0].content == "内容1"
+        assert result[1].summary == "摘要2"
+        
+        mock_call_ai.assert_called_once()
+        assert "[[SLIDE 2]]" in mock_call_ai.call_args[0][0]
+    
+    def test_process_slides_batch_fallback(self):
+        """测试批量解析失败时回退到逐页处理"""
+        mock_call_ai = self.processor._call_ai_api = MagicMock()
+        mock_call_ai.side_effect = [
+            "无法解析的响应",
+            '{"content": "内容1", "summary": "摘要1", "key_points": [], "tags": []}',
+            '{"content": "内容2", "summary": "摘要2", "key_points": [], "tags": []}',
+        ]
+        
+        result = self.processor.process_slides([self.test_slide, self.test_slide])
+        
+        assert len(result) == 2
+        assert result[0].content == "内容1"
+        assert result[1].content == "内容2"
+        assert mock_call_ai.call_count == 3
+    
+    def test_process_slides_concurrent_order(self):
+        """测试并发处理时保持幻灯片顺序"""
+        mock_call_ai = self.processor._call_ai_api = MagicMock()
+        def fake_call(prompt):
+            if "第3页" in prompt:
+                raise Exception("请求超时")
+            return '{"content": "处理后的内容", "summary": "摘要", "key_points": [], "tags": []}'
+        
+        mock_call_ai.side_effect = fake_call
+        self.processor.batch_size = 1
+        
+        slides = []
+        for index in range(1, 5):
+            slide = MagicMock()
+            slide.slide_index = index
+            slide.title = f"第{index}页"
+            slide.text_content = ""
+            slide.bullet_points = []
+            slide.tables = []
+            slide.notes = ""
+            slides.append(slide)
+        
+        result = self.processor.process_slides(slides)
+        
+        assert [slide.slide_index for slide in result] == [1, 2, 3, 4]
+        assert result[2].summary == "AI处理失败: 请求超时"
+        assert result[3].summary == "摘要"
+    
+    def test_session_reused(self, http_mock):
+        """测试HTTP会话在多次调用间复用"""
+        http_mock.post("http://localhost:11434/api/generate", body=b'{"response": "{}", "done": true}')
+        
+        session = self.processor.session
+        self.processor._call_ollama_api("提示1")
+        self.processor._call_ollama_api("提示2")
+        
+        assert len(http_mock.request_history) == 2
+        assert self.processor.session is session
+        assert "https://" in self.processor.session.adapters
+    
+    def test_close(self):
+        """测试上下文管理器关闭会话"""
+        with patch.object(self.processor.session, 'close') as mock_close:
+            with self.processor as processor:
+                assert processor is self.processor
+            mock_close.assert_called_once()
+    
+    def test_call_ai_api_cache(self):
+        """测试AI响应缓存"""
+        with tempfile.TemporaryDirectory() as cache_dir:
+            self.config.set("cache_dir", cache_dir)
+            self.config.set("cache", "readWrite")
+            processor = AIProcessor(self.config)
+            
+            with patch.object(AIProcessor, '_call_ollama_api', return_value='{"content": "缓存"}') as mock_call:
+                assert processor._call_ai_api("测试提示") == '{"content": "缓存"}'
+                assert processor._call_ai_api("测试提示") == '{"content": "缓存"}'
+                mock_call.assert_called_once()
+                
+                # 新实例从磁盘缓存读取
+                assert AIProcessor(self.config)._call_ai_api("测试提示") == '{"content": "缓存"}'
+                mock_call.assert_called_once()
+    
+    def test_cache_key_includes_endpoint_and_parameters(self):
+        """测试缓存键区分服务地址和生成参数"""
+        key = self.processor._cache_key("测试提示", 2000)
+        assert self.processor._cache_key("测试提示", 2000) == key
+        assert self.processor._cache_key("测试提示", 4000) != key
+        
+        self.config.set("base_url", "http://other-host:11434")
+        assert AIProcessor(self.config)._cache_key("测试提示", 2000) != key
+        
+        self.config.set("base_url", self.processor.base_url)
+        self.config.set("temperature", 0.9)
+        assert AIProcessor(self.config)._cache_key("测试提示", 2000) != key
+    
+    @pytest.mark.parametrize("response", ["", "不是JSON", "[1, 2]"], ids=["empty", "text", "not_object"])
+    def test_call_ai_api_skips_unparseable_cache(self, response):
+        """测试无法解析的响应不写入缓存"""
+        with tempfile.TemporaryDirectory() as cache_dir:
+            self.config.set("cache_dir", cache_dir)
+            self.config.set("cache", "readWrite")
+            processor = AIProcessor(self.config)
+            
+            with patch.object(AIProcessor, '_call_ollama_api', return_value=response) as mock_call:
+                assert processor._call_ai_api("测试提示") == response
+                assert processor._call_ai_api("测试提示") == response
+                assert mock_call.call_count == 2
+            
+            assert not any(Path(cache_dir).iterdir())
+    
+    def test_call_ai_api_cache_read_only(self):
+        """测试只读缓存模式不写入缓存"""
+        with tempfile.TemporaryDirectory() as cache_dir:
+            self.config.set("cache_dir", cache_dir)
+            self.config.set("cache", "readOnly")
+            processor = AIProcessor(self.config)
+            
+            with patch.object(AIProcessor, '_call_ollama_api', return_value="响应") as mock_call:
+                processor._call_ai_api("测试提示")
+                processor._call_ai_api("测试提示")
+                assert mock_call.call_count == 2
@@ -2,50 +2,37 @@
 配置模块测试
 """
 
+import json
 import os
-import tempfile
-import unittest
+from functools import lru_cache
 from pathlib import Path
 
-from src.config import Config, get_config
+import pytest
 
+from src import config as config_module
+from src.config import Config
 
-class TestConfig(unittest.TestCase):
+
+class TestConfig:
     """配置测试类"""
     
-    def setUp(self):
+    @pytest.fixture(autouse=True)
+    def setup(self, tmp_path):
         """测试前准备"""
-        # 创建临时配置文件
-        self.temp_dir = tempfile.TemporaryDirectory()
-        self.config_file = Path(self.temp_dir.name) / "test_config.json"
-        
-        # 保存原始环境变量
-        self.original_env = {}
-        for key in ["AI_SERVICE", "MODEL", "BASE_URL", "API_KEY"]:
-            self.original_env[key] = os.getenv(key)
-    
-    def tearDown(self):
-        """测试后清理"""
-        self.temp_dir.cleanup()
-        
-        # 恢复环境变量
-        for key, value in self.original_env.items():
-            if value is not None:
-                os.environ[key] = value
-            elif key in os.environ:
-                del os.environ[key]
+        # 临时配置文件
+        self.config_file = tmp_path / "test_config.json"
     
     def test_default_config(self):
         """测试默认配置"""
         config = Config()
         
-        self.assertEqual(config.get("ai_service"), "ollama")
-        self.assertEqual(config.get("model"), "llama2")
-        self.assertEqual(config.get("base_url"), "http://localhost:11434")
-        self.assertEqual(config.get("api_key"), "")
-        self.assertEqual(config.get("output_format"), "docx")
-        self.assertFalse(config.get("enable_ocr"))
-        self.assertFalse(config.get("verbose"))
+        assert config.get("ai_service") == "ollama"
+        assert config.get("model") == "llama2"
+        assert config.get("base_url") == "http://localhost:11434"
+        assert config.get("api_key") == ""
+        assert config.get("output_format") == "docx"
+        assert not config.get("enable_ocr")
+        assert not config.get("verbose")
     
     def test_config_file(self):
         """测试配置文件加载"""
@@ -61,38 +48,38 @@ class TestConfig(unittest.TestCase):
         }
         
         with open(self.config_file, "w", encoding="utf-8") as f:
-            import json
             json.dump(config_data, f)
         
         config = Config(str(self.config_file))
         
-        self.assertEqual(config.get("ai_service"), "openai")
-        self.assertEqual(config.get("model"), "gpt-3.5-turbo")
-        self.assertEqual(config.get("base_url"), "https://api.openai.com/v1")
-        self.assertEqual(config.get("api_key"), "test_key")
-        self.assertEqual(config.get("output_format"), "markdown")
-        self.assertTrue(config.get("enable_ocr"))
-        self.assertTrue(config.get("verbose"))
+        assert config.get("ai_service") == "openai"
+        assert config.get("model") == "gpt-3.5-turbo"
+        assert config.get("base_url") == "https://api.openai.com/v1"
+        assert config.get("api_key") == "test_key"
+        assert config.get("output_format") == "markdown"
+        assert config.get("enable_ocr")
+        assert config.get("verbose")
     
-    def test_env_variables(self):
+    def test_env_variables(self, monkeypatch):
         """测试环境变量加载"""
-        os.environ["AI_SERVICE"] = "openai"
-        os.environ["MODEL"] = "gpt-4"
-        os.environ["BASE_URL"] = "https://custom.api.com"
-        os.environ["API_KEY"] = "env_key"
-        os.environ["ENABLE_OCR"] = "true"
-        os.environ["VERBOSE"] = "true"
+        # 环境变量通过monkeypatch修改，测试结束后自动还原
+        monkeypatch.setenv("AI_SERVICE", "openai")
+        monkeypatch.setenv("MODEL", "gpt-4")
+        monkeypatch.setenv("BASE_URL", "https://custom.api.com")
+        monkeypatch.setenv("API_KEY", "env_key")
+        monkeypatch.setenv("ENABLE_OCR", "true")
+        monkeypatch.setenv("VERBOSE", "true")
         
         config = Config()
         
-        self.assertEqual(config.get("ai_service"), "openai")
-        self.assertEqual(config.get("model"), "gpt-4")
-        self.assertEqual(config.get("base_url"), "https://custom.api.com")
-        self.assertEqual(config.get("api_key"), "env_key")
-        self.assertTrue(config.get("enable_ocr"))
-        self.assertTrue(config.get("verbose"))
+        assert config.get("ai_service") == "openai"
+        assert config.get("model") == "gpt-4"
+        assert config.get("base_url") == "https://custom.api.com"
+        assert config.get("api_key") == "env_key"
+        assert config.get("enable_ocr")
+        assert config.get("verbose")
     
-    def test_config_override(self):
+    def test_config_override(self, monkeypatch):
         """测试配置覆盖"""
         # 创建配置文件
         config_data = {
@@ -101,17 +88,31 @@ class TestConfig(unittest.TestCase):
         }
         
         with open(self.config_file, "w", encoding="utf-8") as f:
-            import json
             json.dump(config_data, f)
         
-        # 设置环境变量
-        os.environ["MODEL"] = "gpt-4"
+        # 设置环境变量（OpenAI服务需要API密钥才能通过配置验证）
+        monkeypatch.setenv("MODEL", "gpt-4")
+        monkeypatch.setenv("API_KEY", "sk-test-key")
         
         config = Config(str(self.config_file))
         
         # 环境变量应该覆盖配置文件
-        self.assertEqual(config.get("ai_service"), "openai")  # 来自配置文件
-        self.assertEqual(config.get("model"), "gpt-4")  # 来自环境变量
+        assert config.get("ai_service") == "openai"  # 来自配置文件
+        assert config.get("model") == "gpt-4"  # 来自环境变量
+    
+    @pytest.mark.parametrize("config_data", [
+        {"batch_size": "abc"},
+        {"batch_size": 0},
+        {"ai_concurrency": 2.5},
+        {"cache": "sometimes"},
+        {"cache_dir": 123},
+    ], ids=["batch_size_text", "batch_size_zero", "concurrency_float", "cache_mode", "cache_dir"])
+    def test_invalid_config_file(self, config_data):
+        """测试配置文件中无效的批量、并发和缓存配置在加载时报错"""
+        self.config_file.write_text(json.dumps(config_data), encoding="utf-8")
+        
+        with pytest.raises(ValueError, match="配置验证失败"):
+            Config(str(self.config_file))
     
     def test_config_save(self):
         """测试配置保存"""
@@ -125,20 +126,68 @@ class TestConfig(unittest.TestCase):
         # 重新加载配置
         new_config = Config(str(self.config_file))
         
-        self.assertEqual(new_config.get("ai_service"), "openai")
-        self.assertEqual(new_config.get("model"), "gpt-4")
-        self.assertEqual(new_config.get("api_key"), "test_key")
+        assert new_config.get("ai_service") == "openai"
+        assert new_config.get("model") == "gpt-4"
+        assert new_config.get("api_key") == "test_key"
     
-    def test_get_config_singleton(self):
-        """测试全局配置单例"""
-        config1 = get_config()
-        config2 = get_config()
+    def test_force_reload_on_file_change(self):
+        """测试配置文件修改后重新加载"""
+        self.config_file.write_text('{"model": "model-a"}', encoding="utf-8")
+        config = Config(str(self.config_file))
+        assert config.get("model", force_reload=True) == "model-a"
         
-        self.assertIs(config1, config2)
+        self.config_file.write_text('{"model": "model-b"}', encoding="utf-8")
+        stat = self.config_file.stat()
+        os.utime(self.config_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
         
-        config1.set("test_key", "test_value")
-        self.assertEqual(config2.get("test_key"), "test_value")
-
-
-if __name__ == "__main__":
-    unittest.main()
+        assert config.get("model", force_reload=True) == "model-b"
+    
+    def test_force_reload_on_env_change(self, monkeypatch):
+        """测试环境变量修改后重新加载"""
+        monkeypatch.setenv("MAX_TOKENS", "100")
+        config = Config()
+        assert config.get("max_tokens", force_reload=True) == 100
+        
+        monkeypatch.setenv("MAX_TOKENS", "200")
+        assert config.get("max_tokens", force_reload=True) == 200
+        assert config.get_all(force_reload=True)["max_tokens"] == 200
+    
+    def test_force_reload_drops_overrides(self):
+        """测试重新加载丢弃set()的修改"""
+        config = Config()
+        original = config.get("model")
+        config.set("model", "override")
+        assert config.get("model") == "override"
+        assert config.get("model", force_reload=True) == original
+    
+    @pytest.fixture
+    def fresh_get_config(self, monkeypatch):
+        """测试期间使用新的全局配置单例，测试中的修改不会残留到其他测试"""
+        monkeypatch.setattr(config_module, "_get_config", lru_cache(maxsize=None)(config_module._get_config.__wrapped__))
+        monkeypatch.setattr(config_module, "_FAST_CACHE", config_module._FAST_CACHE)
+        monkeypatch.setattr(config_module, "_FAST_HASH", None)
+        return config_module.get_config
+    
+    def test_get_config_singleton(self, fresh_get_config):
+        """测试全局配置单例"""
+        config = fresh_get_config()
+        assert fresh_get_config() is config
+        
+        config.set("test_key", "test_value")
+        assert fresh_get_config().get("test_key") == "test_value"
+    
+    def test_get_config_call_forms(self, fresh_get_config):
+        """测试不同调用方式获取的是同一个全局配置实例"""
+        config = fresh_get_config()
+        assert fresh_get_config(None) is config
+        assert fresh_get_config(config_file=None) is config
+    
+    def test_module_get_snapshot(self, fresh_get_config):
+        """测试模块级get在配置变化后返回新值"""
+        config = fresh_get_config()
+        config.set("snapshot_key", "old")
+        assert config_module.get("snapshot_key") == "old"
+        
+        config_module.set("snapshot_key", "new")
+        assert config_module.get("snapshot_key") == "new"
+        assert config.get_all()["snapshot_key"] == "new"
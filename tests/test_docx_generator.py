@@ -0,0 +1,37 @@
+"""
+Docx生成器测试
+"""
+
+import io
+
+import docx
+
+from src.docx_generator import DocxGenerator
+from src.ppt_parser import SlideContent
+
+
+class TestDocxGenerator:
+    """Docx生成器测试类"""
+    
+    def test_generate_tables_and_notes(self):
+        """测试表格和备注原样输出，不按Markdown标记解析，也不添加文档信息和目录"""
+        slide = SlideContent(
+            slide_index=1,
+            title="标题1",
+            text_content="正文内容",
+            bullet_points=["项目符号1"],
+            tables=[{"data": [["- 列1", "# 列2"], ["1. 值1", "值2"]]}],
+            images=[],
+            notes="# 备注内容"
+        )
+        
+        buf = io.BytesIO()
+        DocxGenerator().generate([slide], buf)
+        
+        buf.seek(0)
+        doc = docx.Document(buf)
+        headings = [p.text for p in doc.paragraphs if p.style.name.startswith(("Title", "Heading"))]
+        
+        assert headings == ["PPT转换文档", "1. 标题1", "主要内容", "关键点", "备注"]
+        assert [[cell.text for cell in row.cells] for row in doc.tables[0].rows] == [["- 列1", "# 列2"], ["1. 值1", "值2"]]
+        assert "# 备注内容" in [p.text for p in doc.paragraphs]
@@ -2,254 +2,162 @@
 主程序测试
 """
 
-import unittest
-from unittest.mock import patch, MagicMock
+import logging
+from unittest.mock import MagicMock
 import sys
 from pathlib import Path
+from types import SimpleNamespace
 
-from src.main import setup_logging, main
+import pytest
 
+from src.main import setup_logging, main, run
 
-class TestMain(unittest.TestCase):
+
+@pytest.fixture
+def ppt_file(monkeypatch):
+    """测试用PPT路径：主程序各组件均被模拟，不会读取文件，只需通过存在性检查"""
+    path = Path("test.pptx")
+    exists = Path.exists
+    monkeypatch.setattr(Path, "exists", lambda self, *args, **kwargs: self == path or exists(self, *args, **kwargs))
+    return path
+
+
+# main_mocks中的名称与src.main中被替换的对象
+_MAIN_TARGETS = {
+    "config": "Config",
+    "ppt": "PPTParser",
+    "ocr": "OCRProcessor",
+    "ai": "AIProcessor",
+    "doc_gen": "DocumentGenerator",
+    "md_gen": "MarkdownGenerator",
+    "docx_gen": "DocxGenerator",
+}
+
+
+@pytest.fixture
+def main_mocks(monkeypatch):
+    """一次性替换主程序依赖的各个组件，测试只需设置关心的返回值"""
+    mocks = SimpleNamespace(**{name: MagicMock() for name in _MAIN_TARGETS})
+    for name, target in _MAIN_TARGETS.items():
+        monkeypatch.setattr(f"src.main.{target}", getattr(mocks, name))
+    return mocks
+
+
+class TestMain:
     """主程序测试类"""
     
-    def setUp(self):
+    @pytest.fixture(autouse=True)
+    def setup(self, ppt_file, main_mocks, monkeypatch):
         """测试前准备"""
-        # 保存原始sys.argv
-        self.original_argv = sys.argv.copy()
-        
-        # 创建测试文件
-        self.test_dir = Path("tests/test_files")
-        self.test_dir.mkdir(exist_ok=True)
-        
-        self.test_ppt = self.test_dir / "test.pptx"
-        self.test_ppt.write_text("测试PPT文件")
+        # 注入测试PPT路径和主程序组件的模拟对象
+        self.test_ppt = ppt_file
+        self.mocks = main_mocks
         
-        self.output_file = self.test_dir / "output.docx"
+        # 测试中替换的sys.argv在测试结束后自动还原
+        monkeypatch.setattr(sys, "argv", sys.argv.copy())
     
-    def tearDown(self):
-        """测试后清理"""
-        # 恢复sys.argv
-        sys.argv = self.original_argv
-        
-        # 清理测试文件
-        if self.test_ppt.exists():
-            self.test_ppt.unlink()
-        
-        if self.output_file.exists():
-            self.output_file.unlink()
-    
-    def test_setup_logging_verbose(self):
+    def test_setup_logging_verbose(self, caplog):
         """测试详细日志设置"""
-        with self.assertLogs(level='DEBUG') as log:
-            setup_logging(verbose=True)
-            logger = __import__('logging').getLogger(__name__)
-            logger.debug("测试调试信息")
-            self.assertIn("测试调试信息", log.output[0])
+        setup_logging(verbose=True)
+        logging.getLogger(__name__).debug("测试调试信息")
+        
+        assert "测试调试信息" in caplog.text
     
-    def test_setup_logging_normal(self):
+    def test_setup_logging_normal(self, caplog):
         """测试普通日志设置"""
-        with self.assertLogs(level='INFO') as log:
-            setup_logging(verbose=False)
-            logger = __import__('logging').getLogger(__name__)
-            logger.info("测试信息")
-            self.assertIn("测试信息", log.output[0])
-    
-    @patch('src.main.PPTParser')
-    @patch('src.main.AIProcessor')
-    @patch('src.main.OCRProcessor')
-    @patch('src.main.DocumentGenerator')
-    @patch('src.main.Config')
-    def test_main_success(self, mock_config, mock_doc_gen, mock_ocr, mock_ai, mock_ppt):
-        """测试主程序成功执行"""
-        # 模拟参数
-        sys.argv = [
-            'main.py',
-            str(self.test_ppt),
-            '--format', 'docx',
-            '--ai', 'ollama',
-            '--verbose'
-        ]
-        
-        # 模拟配置
-        mock_config_instance = MagicMock()
-        mock_config.return_value = mock_config_instance
-        
-        # 模拟PPT解析器
-        mock_ppt_instance = MagicMock()
-        mock_ppt_instance.extract_text.return_value = ['slide1', 'slide2']
-        mock_ppt.return_value = mock_ppt_instance
-        
-        # 模拟AI处理器
-        mock_ai_instance = MagicMock()
-        mock_ai_instance.process_slides.return_value = ['processed1', 'processed2']
-        mock_ai.return_value = mock_ai_instance
-        
-        # 模拟OCR处理器
-        mock_ocr_instance = MagicMock()
-        mock_ocr_instance.process_slides.return_value = ['ocr1', 'ocr2']
-        mock_ocr.return_value = mock_ocr_instance
-        
-        # 模拟文档生成器
-        mock_doc_gen_instance = MagicMock()
-        mock_doc_gen.return_value = mock_doc_gen_instance
-        
-        # 执行测试
-        try:
-            main()
-        except SystemExit as e:
-            self.assertEqual(e.code, 0)  # 成功退出
+        setup_logging(verbose=False)
+        logging.getLogger(__name__).info("测试信息")
+        logging.getLogger(__name__).debug("不应输出的调试信息")
         
-        # 验证调用
-        mock_config.assert_called_once()
-        mock_ppt.assert_called_once()
-        mock_ppt_instance.extract_text.assert_called_once_with(self.test_ppt)
-        
-        # OCR应该被调用（因为--ocr参数）
-        mock_ocr.assert_called_once()
-        mock_ocr_instance.process_slides.assert_called_once_with(self.test_ppt, ['slide1', 'slide2'])
-        
-        mock_ai.assert_called_once()
-        mock_ai_instance.process_slides.assert_called_once_with(['ocr1', 'ocr2'])
-        
-        mock_doc_gen.assert_called_once()
-        mock_doc_gen_instance.generate_docx.assert_called_once_with(['processed1', 'processed2'], self.test_ppt.with_suffix('.docx'))
+        assert "测试信息" in caplog.text
+        assert "不应输出的调试信息" not in caplog.text
     
-    @patch('src.main.PPTParser')
-    @patch('src.main.Config')
-    def test_main_file_not_found(self, mock_config, mock_ppt):
-        """测试文件不存在的情况"""
-        # 模拟参数
-        sys.argv = [
-            'main.py',
-            'nonexistent.pptx'
-        ]
-        
-        # 模拟配置
-        mock_config_instance = MagicMock()
-        mock_config.return_value = mock_config_instance
+    @pytest.mark.parametrize("argv_extra, expected_method, suffix, ai_error, exit_code", [
+        (['--format', 'docx', '--ai', 'ollama', '--ocr', '--verbose'], "generate_docx", ".docx", None, 0),
+        ([], "generate_docx", ".docx", None, 0),
+        (['--format', 'markdown'], "generate_markdown", ".md", None, 0),
+        (['--verbose'], None, None, Exception("AI处理失败"), 1),
+    ], ids=["ocr", "no_ocr", "markdown", "ai_error"])
+    def test_main(self, argv_extra, expected_method, suffix, ai_error, exit_code):
+        """测试主程序的转换流程"""
+        mocks = self.mocks
+        sys.argv = ['main.py', str(self.test_ppt), *argv_extra]
+        
+        mocks.ppt.return_value.extract_text.return_value = ['slide1', 'slide2']
+        mocks.ocr.return_value.process_slides.return_value = ['ocr1', 'ocr2']
+        process_slides = mocks.ai.get_or_create.return_value.process_slides
+        process_slides.return_value = ['processed1', 'processed2']
+        process_slides.side_effect = ai_error
         
         # 执行测试
-        with self.assertRaises(SystemExit) as cm:
+        with pytest.raises(SystemExit) as cm:
             main()
         
-        self.assertEqual(cm.exception.code, 1)  # 错误退出
-    
-    @patch('src.main.PPTParser')
-    @patch('src.main.AIProcessor')
-    @patch('src.main.Config')
-    def test_main_ai_error(self, mock_config, mock_ai, mock_ppt):
-        """测试AI处理错误的情况"""
-        # 模拟参数
-        sys.argv = [
-            'main.py',
-            str(self.test_ppt),
-            '--verbose'
-        ]
-        
-        # 模拟配置
-        mock_config_instance = MagicMock()
-        mock_config.return_value = mock_config_instance
-        
-        # 模拟PPT解析器
-        mock_ppt_instance = MagicMock()
-        mock_ppt_instance.extract_text.return_value = ['slide1']
-        mock_ppt.return_value = mock_ppt_instance
+        assert cm.value.code == exit_code
         
-        # 模拟AI处理器抛出异常
-        mock_ai_instance = MagicMock()
-        mock_ai_instance.process_slides.side_effect = Exception("AI处理失败")
-        mock_ai.return_value = mock_ai_instance
-        
-        # 执行测试
-        with self.assertRaises(SystemExit) as cm:
-            main()
-        
-        self.assertEqual(cm.exception.code, 1)  # 错误退出
+        # 验证调用
+        mocks.config.assert_called_once()
+        mocks.ppt.return_value.extract_text.assert_called_once_with(self.test_ppt)
+        
+        # 只有指定--ocr时才进行OCR，否则AI处理器直接处理PPT解析结果
+        if '--ocr' in argv_extra:
+            mocks.ocr.return_value.process_slides.assert_called_once_with(self.test_ppt, ['slide1', 'slide2'])
+            process_slides.assert_called_once_with(['ocr1', 'ocr2'])
+        else:
+            mocks.ocr.assert_not_called()
+            process_slides.assert_called_once_with(['slide1', 'slide2'])
+        
+        if expected_method:
+            getattr(mocks.doc_gen.return_value, expected_method).assert_called_once_with(
+                ['processed1', 'processed2'], self.test_ppt.with_suffix(suffix))
+        else:
+            mocks.doc_gen.assert_not_called()
     
-    @patch('src.main.PPTParser')
-    @patch('src.main.AIProcessor')
-    @patch('src.main.DocumentGenerator')
-    @patch('src.main.Config')
-    def test_main_markdown_format(self, mock_config, mock_doc_gen, mock_ai, mock_ppt):
-        """测试Markdown格式输出"""
-        # 模拟参数
-        sys.argv = [
-            'main.py',
-            str(self.test_ppt),
-            '--format', 'markdown'
-        ]
-        
-        # 模拟配置
-        mock_config_instance = MagicMock()
-        mock_config.return_value = mock_config_instance
-        
-        # 模拟PPT解析器
-        mock_ppt_instance = MagicMock()
-        mock_ppt_instance.extract_text.return_value = ['slide1']
-        mock_ppt.return_value = mock_ppt_instance
-        
-        # 模拟AI处理器
-        mock_ai_instance = MagicMock()
-        mock_ai_instance.process_slides.return_value = ['processed1']
-        mock_ai.return_value = mock_ai_instance
-        
-        # 模拟文档生成器
-        mock_doc_gen_instance = MagicMock()
-        mock_doc_gen.return_value = mock_doc_gen_instance
-        
-        # 执行测试
-        try:
+    @pytest.mark.parametrize("argv_extra, generator, suffix, streamed", [
+        (['--no-ai', '--format', 'markdown'], "md_gen", ".md", True),
+        (['--no-ai'], "docx_gen", ".docx", True),
+        (['--no-ai', '--ocr', '--format', 'markdown'], "md_gen", ".md", False),
+    ], ids=["markdown", "docx", "markdown_ocr"])
+    def test_main_no_ai(self, argv_extra, generator, suffix, streamed):
+        """测试跳过AI处理：不做OCR时逐页解析，解析结果直接交给生成器"""
+        mocks = self.mocks
+        sys.argv = ['main.py', str(self.test_ppt), *argv_extra]
+        
+        parser = mocks.ppt.return_value
+        parser.iter_slides.return_value = iter(['slide1', 'slide2'])
+        parser.extract_text.return_value = ['slide1', 'slide2']
+        mocks.ocr.return_value.process_slides.return_value = ['ocr1', 'ocr2']
+        
+        with pytest.raises(SystemExit) as cm:
             main()
-        except SystemExit as e:
-            self.assertEqual(e.code, 0)  # 成功退出
         
-        # 验证调用
-        mock_doc_gen_instance.generate_markdown.assert_called_once_with(['processed1'], self.test_ppt.with_suffix('.md'))
+        assert cm.value.code == 0
+        mocks.ai.get_or_create.assert_not_called()
+        mocks.doc_gen.assert_not_called()
+        
+        if streamed:
+            parser.extract_text.assert_not_called()
+            expected_slides = parser.iter_slides.return_value
+        else:
+            parser.iter_slides.assert_not_called()
+            expected_slides = ['ocr1', 'ocr2']
+        getattr(mocks, generator).return_value.generate.assert_called_once_with(
+            expected_slides, self.test_ppt.with_suffix(suffix))
     
-    @patch('src.main.PPTParser')
-    @patch('src.main.AIProcessor')
-    @patch('src.main.OCRProcessor')
-    @patch('src.main.DocumentGenerator')
-    @patch('src.main.Config')
-    def test_main_no_ocr(self, mock_config, mock_doc_gen, mock_ocr, mock_ai, mock_ppt):
-        """测试不启用OCR的情况"""
+    def test_main_file_not_found(self, tmp_path):
+        """测试文件不存在的情况"""
         # 模拟参数
         sys.argv = [
             'main.py',
-            str(self.test_ppt)
+            str(tmp_path / 'nonexistent.pptx')
         ]
         
-        # 模拟配置
-        mock_config_instance = MagicMock()
-        mock_config.return_value = mock_config_instance
-        
-        # 模拟PPT解析器
-        mock_ppt_instance = MagicMock()
-        mock_ppt_instance.extract_text.return_value = ['slide1']
-        mock_ppt.return_value = mock_ppt_instance
-        
-        # 模拟AI处理器
-        mock_ai_instance = MagicMock()
-        mock_ai_instance.process_slides.return_value = ['processed1']
-        mock_ai.return_value = mock_ai_instance
-        
-        # 模拟文档生成器
-        mock_doc_gen_instance = MagicMock()
-        mock_doc_gen.return_value = mock_doc_gen_instance
-        
         # 执行测试
-        try:
+        with pytest.raises(SystemExit) as cm:
             main()
-        except SystemExit as e:
-            self.assertEqual(e.code, 0)  # 成功退出
         
-        # 验证OCR没有被调用
-        mock_ocr.assert_not_called()
-        
-        # AI处理器应该直接处理PPT解析结果
-        mock_ai_instance.process_slides.assert_called_once_with(['slide1'])
-
-
-if __name__ == "__main__":
-    unittest.main()
+        assert cm.value.code == 1  # 错误退出
+    
+    def test_run_file_not_found(self, tmp_path):
+        """测试run在文件不存在时返回False"""
+        assert not run(str(tmp_path / 'nonexistent.pptx'), format='markdown')
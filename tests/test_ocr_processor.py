@@ -0,0 +1,46 @@
+"""
+OCR处理器测试
+"""
+
+import io
+from unittest.mock import MagicMock
+
+from PIL import Image
+
+from src import ocr_processor as ocr_module
+from src.ocr_processor import OCRProcessor
+
+
+class TestOCRProcessor:
+    """OCR处理器测试类"""
+    
+    def test_close_with_easyocr_reader(self, monkeypatch):
+        """测试使用easyocr后端时可以正常释放资源"""
+        reader = MagicMock()
+        monkeypatch.setattr(OCRProcessor, "_create_easyocr_reader", lambda self, gpu: reader)
+        
+        processor = OCRProcessor(backend="easyocr")
+        assert processor._reader is reader
+        assert processor.tesseract_available
+        
+        processor.close()
+        assert processor._reader is None
+        assert processor._apis == []
+    
+    def test_pytesseract_uses_lang(self, monkeypatch):
+        """测试pytesseract使用配置的识别语言"""
+        monkeypatch.setattr(ocr_module, "PyTessBaseAPI", None)
+        monkeypatch.setattr(ocr_module.pytesseract, "get_tesseract_version", MagicMock())
+        image_to_data = MagicMock(return_value={
+            "text": ["文本"], "conf": [90], "left": [1], "top": [2], "width": [3], "height": [4]
+        })
+        monkeypatch.setattr(ocr_module.pytesseract, "image_to_data", image_to_data)
+        
+        buf = io.BytesIO()
+        Image.new("RGB", (8, 8), "white").save(buf, format="PNG")
+        
+        processor = OCRProcessor(lang="eng+chi_sim")
+        result = processor._perform_ocr("image.png", buf.getvalue())
+        
+        assert result.text == "文本"
+        assert image_to_data.call_args.kwargs["lang"] == "eng+chi_sim"
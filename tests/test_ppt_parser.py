@@ -2,211 +2,234 @@
 PPT解析器测试
 """
 
-import unittest
+import io
+import sys
 from pathlib import Path
-from unittest.mock import patch, MagicMock
+from types import SimpleNamespace
+from unittest.mock import MagicMock, PropertyMock
 
-from src.ppt_parser import PPTParser, SlideContent
+import pytest
 
+from src.ppt_parser import PPTParser, SlideContent, _count_slides, _open_presentation
 
-class TestPPTParser(unittest.TestCase):
+# 解析器模块，测试直接替换其中的Presentation
+_PARSER_MODULE = sys.modules[PPTParser.__module__]
+
+# 预先生成的测试PPT：标题页、带两级项目符号的内容页、带3x3表格的表格页
+_FIXTURE_PPTX = Path(__file__).parent / "fixtures" / "test_presentation.pptx"
+
+
+class _FakeShape:
+    """只包含解析器读取的属性的文本框形状"""
+    
+    __slots__ = ("has_text_frame", "text", "text_frame", "shape_type")
+    
+    def __init__(self, paragraphs=()):
+        self.has_text_frame = True
+        self.text = "\n".join(paragraph.text for paragraph in paragraphs)
+        self.text_frame = SimpleNamespace(paragraphs=list(paragraphs))
+        self.shape_type = None
+
+
+class _FakeShapes(list):
+    """幻灯片的形状集合，与python-pptx一样可以通过title获取标题形状"""
+    
+    def __init__(self, shapes, title=None):
+        super().__init__(shapes)
+        self.title = title
+
+
+def _paragraph(text: str, level: int = 0, bullet=None) -> SimpleNamespace:
+    """构建段落"""
+    return SimpleNamespace(text=text, level=level, paragraph_format=SimpleNamespace(bullet=bullet))
+
+
+def _text_shape(text: str) -> _FakeShape:
+    """构建只有一个段落的文本框"""
+    return _FakeShape(paragraphs=[_paragraph(text)])
+
+
+def _fake_slide(shapes, title=None, notes: str = "") -> SimpleNamespace:
+    """构建幻灯片"""
+    return SimpleNamespace(
+        shapes=_FakeShapes(shapes, title),
+        slide_id=256,
+        has_notes_slide=bool(notes),
+        notes_slide=SimpleNamespace(notes_text_frame=SimpleNamespace(text=notes)),
+    )
+
+
+def _build_pptx_slides() -> list:
+    """构建模拟Presentation中的幻灯片"""
+    title1 = _text_shape("标题1")
+    slide1 = _fake_slide(
+        [title1, _text_shape("正文内容1"), _text_shape("• 项目符号1"), _text_shape("• 项目符号2")],
+        title=title1,
+        notes="备注内容1",
+    )
+    
+    title2 = _text_shape("标题2")
+    slide2 = _fake_slide([title2, _text_shape("正文内容2")], title=title2)
+    
+    return [slide1, slide2]
+
+
+def _build_content_slide():
+    """构建包含多个文本框的模拟幻灯片"""
+    title = _text_shape("")
+    shape1 = _FakeShape(paragraphs=[
+        _paragraph("段落1"),
+        _paragraph("• 项目符号1", level=1),
+        _paragraph("段落2"),
+    ])
+    shape2 = _FakeShape(paragraphs=[_paragraph("• 项目符号2", level=1)])
+    return _fake_slide([title, shape1, shape2], title=title)
+
+
+# 模拟的幻灯片只读，各测试共用
+_PPTX_SLIDES = _build_pptx_slides()
+_CONTENT_SLIDE = _build_content_slide()
+
+
+@pytest.fixture(scope="module")
+def parser():
+    """解析器不保存解析状态，模块内共用一个实例"""
+    return PPTParser()
+
+
+@pytest.fixture(scope="module")
+def test_ppt_bytes():
+    """内存中的测试PPT文件内容，模块内只读取一次"""
+    return _FIXTURE_PPTX.read_bytes()
+
+
+@pytest.fixture(scope="module")
+def test_ppt():
+    """磁盘上的测试PPT文件，只在需要文件路径的测试中使用"""
+    return _FIXTURE_PPTX
+
+
+class TestPPTParser:
     """PPT解析器测试类"""
     
-    def setUp(self):
+    @pytest.fixture(autouse=True)
+    def setup(self, parser):
         """测试前准备"""
-        self.parser = PPTParser()
+        self.parser = parser
         
-        # 创建测试PPT文件路径
-        self.test_ppt = Path("tests/test_files/test_presentation.pptx")
-        self.test_ppt.parent.mkdir(exist_ok=True)
-        
-        # 如果测试文件不存在，创建一个简单的测试文件
-        if not self.test_ppt.exists():
-            self._create_test_ppt()
-    
-    def _create_test_ppt(self):
-        """创建测试PPT文件"""
-        try:
-            from pptx import Presentation
-            from pptx.util import Inches
-            
-            # 创建演示文稿
-            prs = Presentation()
-            
-            # 第1页：标题页
-            title_slide_layout = prs.slide_layouts[0]
-            slide = prs.slides.add_slide(title_slide_layout)
-            title = slide.shapes.title
-            subtitle = slide.placeholders[1]
-            
-            title.text = "测试演示文稿"
-            subtitle.text = "AI PPT转换器测试"
-            
-            # 第2页：内容页
-            bullet_slide_layout = prs.slide_layouts[1]
-            slide = prs.slides.add_slide(bullet_slide_layout)
-            title = slide.shapes.title
-            body_shape = slide.shapes.placeholders[1]
-            tf = body_shape.text_frame
-            tf.text = "内容页"
-            
-            # 添加项目符号
-            p = tf.add_paragraph()
-            p.text = "第一点"
-            p.level = 1
-            
-            p = tf.add_paragraph()
-            p.text = "第二点"
-            p.level = 1
-            
-            # 第3页：表格页
-            blank_slide_layout = prs.slide_layouts[6]
-            slide = prs.slides.add_slide(blank_slide_layout)
-            
-            # 添加标题
-            left = top = Inches(1)
-            width = Inches(2)
-            height = Inches(0.5)
-            txBox = slide.shapes.add_textbox(left, top, width, height)
-            tf = txBox.text_frame
-            tf.text = "表格页"
-            
-            # 添加表格
-            rows, cols = 3, 3
-            left = Inches(1)
-            top = Inches(2)
-            width = Inches(6)
-            height = Inches(2)
-            table = slide.shapes.add_table(rows, cols, left, top, width, height).table
-            
-            # 填充表格
-            for row in range(rows):
-                for col in range(cols):
-                    table.cell(row, col).text = f"单元格 {row+1},{col+1}"
-            
-            # 保存文件
-            prs.save(str(self.test_ppt))
-            
-        except ImportError:
-            # 如果python-pptx不可用，创建一个空文件
-            self.test_ppt.write_text("测试PPT文件")
-    
-    @patch('src.ppt_parser.Presentation')
-    def test_extract_text_with_pptx(self, mock_presentation):
+        # 已解析的PPT会被缓存，避免各测试模拟的Presentation互相影响
+        _open_presentation.cache_clear()
+    
+    def test_extract_text_with_pptx(self, test_ppt_bytes, monkeypatch):
         """测试使用python-pptx提取文本"""
-        # 模拟Presentation对象
-        mock_prs = MagicMock()
-        mock_presentation.return_value = mock_prs
-        
-        # 模拟幻灯片
-        mock_slide1 = MagicMock()
-        mock_slide1.shapes.title.text = "标题1"
-        mock_slide1.shapes = [
-            MagicMock(has_text_frame=True, text="标题1"),
-            MagicMock(has_text_frame=True, text="正文内容1"),
-            MagicMock(has_text_frame=True, text="• 项目符号1"),
-            MagicMock(has_text_frame=True, text="• 项目符号2"),
-        ]
-        mock_slide1.has_notes_slide = True
-        mock_slide1.notes_slide.notes_text_frame.text = "备注内容1"
-        
-        mock_slide2 = MagicMock()
-        mock_slide2.shapes.title.text = "标题2"
-        mock_slide2.shapes = [
-            MagicMock(has_text_frame=True, text="标题2"),
-            MagicMock(has_text_frame=True, text="正文内容2"),
-        ]
-        mock_slide2.has_notes_slide = False
-        
-        mock_prs.slides = [mock_slide1, mock_slide2]
+        # 模拟Presentation对象（直接传入模块对象，不按字符串路径解析）
+        monkeypatch.setattr(_PARSER_MODULE, "Presentation", MagicMock(return_value=SimpleNamespace(slides=_PPTX_SLIDES)))
         
         # 执行测试
-        result = self.parser.extract_text(self.test_ppt)
+        result = self.parser.extract_text(io.BytesIO(test_ppt_bytes))
         
         # 验证结果
-        self.assertEqual(len(result), 2)
-        self.assertEqual(result[0].title, "标题1")
-        self.assertEqual(result[0].text_content, "正文内容1")
-        self.assertEqual(result[0].bullet_points, ["项目符号1", "项目符号2"])
-        self.assertEqual(result[0].notes, "备注内容1")
-        
-        self.assertEqual(result[1].title, "标题2")
-        self.assertEqual(result[1].text_content, "正文内容2")
-        self.assertEqual(result[1].bullet_points, [])
-        self.assertEqual(result[1].notes, "")
+        assert len(result) == 2
+        assert result[0].title == "标题1"
+        assert result[0].text_content == "正文内容1"
+        assert result[0].bullet_points == ["项目符号1", "项目符号2"]
+        assert result[0].notes == "备注内容1"
+        
+        assert result[1].title == "标题2"
+        assert result[1].text_content == "正文内容2"
+        assert result[1].bullet_points == []
+        assert result[1].notes == ""
     
-    def test_extract_basic_text(self):
+    def test_extract_basic_text(self, test_ppt, monkeypatch):
         """测试基本文本提取"""
         # 模拟python-pptx导入失败
-        with patch('src.ppt_parser.Presentation', side_effect=ImportError):
-            result = self.parser.extract_text(self.test_ppt)
-            
-            # 验证结果
-            self.assertEqual(len(result), 1)
-            self.assertEqual(result[0].title, "PPT内容")
-            self.assertIn("无法使用高级解析功能", result[0].text_content)
-    
-    def test_extract_slide_title(self):
-        """测试提取幻灯片标题"""
-        # 模拟幻灯片
-        mock_slide = MagicMock()
-        mock_slide.shapes.title = MagicMock()
-        mock_slide.shapes.title.text = "测试标题"
+        monkeypatch.setattr(_PARSER_MODULE, "Presentation", MagicMock(side_effect=ImportError))
+        result = self.parser.extract_text(test_ppt)
         
-        title = self.parser._extract_slide_title(mock_slide)
-        self.assertEqual(title, "测试标题")
+        # 验证结果
+        assert len(result) == 1
+        assert result[0].title == "PPT内容"
+        assert "无法使用高级解析功能" in result[0].text_content
+    
+    def test_iter_slides_basic_text(self, test_ppt, monkeypatch):
+        """测试逐页提取在解析失败时回退到基本文本提取"""
+        monkeypatch.setattr(_PARSER_MODULE, "Presentation", MagicMock(side_effect=ImportError))
+        result = list(self.parser.iter_slides(test_ppt))
+        
+        assert len(result) == 1
+        assert result[0].title == "PPT内容"
+    
+    def test_iter_slides_missing_file(self):
+        """测试逐页提取不存在的文件时立即报错"""
+        with pytest.raises(FileNotFoundError):
+            self.parser.iter_slides("tests/test_files/missing.pptx")
+    
+    def test_count_slides(self, test_ppt):
+        """测试不解析PPT直接统计幻灯片数量"""
+        assert _count_slides(test_ppt) == 3
+    
+    @pytest.mark.parametrize("slide_total, in_worker, expected", [
+        (3000, False, (4, 3000)),
+        (600, False, (2, 600)),
+        (300, False, (1, 300)),
+        (3000, True, (1, 0)),
+    ], ids=["large_deck", "medium_deck", "small_deck", "worker_process"])
+    def test_parallel_workers(self, test_ppt, monkeypatch, slide_total, in_worker, expected):
+        """测试大文档按CPU核数并行解析，已在子进程中时不再创建进程池"""
+        monkeypatch.setattr(_PARSER_MODULE, "_available_cpus", lambda: 4)
+        monkeypatch.setattr(_PARSER_MODULE, "_count_slides", lambda path: slide_total)
+        monkeypatch.setattr(_PARSER_MODULE.multiprocessing, "parent_process", lambda: object() if in_worker else None)
+        
+        assert self.parser._parallel_workers(test_ppt) == expected
+    
+    @pytest.mark.parametrize("slide, expected", [
+        (_fake_slide([_text_shape("测试标题")], title=_text_shape("测试标题")), "测试标题"),
+        (_fake_slide([_text_shape(" "), _text_shape(" 文本框标题 ")]), "文本框标题"),
+        (_fake_slide([]), "幻灯片 256"),
+    ], ids=["title_placeholder", "first_text_box", "slide_id"])
+    def test_extract_slide_title(self, slide, expected):
+        """测试提取幻灯片标题：标题占位符、第一个非空文本框、幻灯片编号依次回退"""
+        assert self.parser._extract_slide_title(slide) == expected
     
     def test_extract_text_content(self):
         """测试提取文本内容"""
-        # 模拟幻灯片
-        mock_slide = MagicMock()
-        mock_slide.shapes.title = MagicMock()
-        
-        # 模拟形状
-        mock_shape1 = MagicMock()
-        mock_shape1.has_text_frame = True
-        mock_shape1.text_frame.paragraphs = [
-            MagicMock(text="段落1", level=0, paragraph_format=MagicMock(bullet=None)),
-            MagicMock(text="• 项目符号1", level=1, paragraph_format=MagicMock(bullet=None)),
-            MagicMock(text="段落2", level=0, paragraph_format=MagicMock(bullet=None)),
-        ]
-        
-        mock_shape2 = MagicMock()
-        mock_shape2.has_text_frame = True
-        mock_shape2.text_frame.paragraphs = [
-            MagicMock(text="• 项目符号2", level=1, paragraph_format=MagicMock(bullet=None)),
-        ]
-        
-        mock_slide.shapes = [mock_slide.shapes.title, mock_shape1, mock_shape2]
-        
-        text_content, bullet_points = self.parser._extract_text_content(mock_slide)
+        text_content, bullet_points = self.parser._extract_text_content(_CONTENT_SLIDE)
         
-        self.assertIn("段落1", text_content)
-        self.assertIn("段落2", text_content)
-        self.assertIn("项目符号1", bullet_points)
-        self.assertIn("项目符号2", bullet_points)
-    
-    def test_is_bullet_point(self):
-        """测试判断项目符号"""
-        # 模拟段落
-        mock_para = MagicMock()
-        mock_para.paragraph_format.bullet = True
-        mock_para.text = "测试项目符号"
-        
-        result = self.parser._is_bullet_point(mock_para)
-        self.assertTrue(result)
+        assert "段落1" in text_content
+        assert "段落2" in text_content
+        assert "项目符号1" in bullet_points
+        assert "项目符号2" in bullet_points
+    
+    @pytest.mark.parametrize("text, expected", [
+        ("• 项目符号", "项目符号"),
+        ("➤\t项目符号", "项目符号"),
+        ("-5°C", "-5°C"),
+        ("*args", "*args"),
+        ("•项目符号", "•项目符号"),
+    ], ids=["bullet_glyph", "arrow_glyph", "negative_number", "star_args", "glyph_without_space"])
+    def test_extract_bullet_text(self, text, expected):
+        """测试只去掉后跟空白的项目符号字符"""
+        slide = _fake_slide([_FakeShape(paragraphs=[_paragraph(text, level=1)])])
+        _, bullet_points = self.parser._extract_text_content(slide)
+        assert bullet_points == [expected]
+    
+    @pytest.mark.parametrize("bullet, text, expected", [
+        (True, "测试项目符号", True),
+        (None, "• 项目符号", True),
+        (None, "普通文本", False),
+    ], ids=["bullet_format", "bullet_prefix", "plain_text"])
+    def test_is_bullet_point(self, bullet, text, expected):
+        """测试判断项目符号：段落格式中的项目符号、文本开头的项目符号、普通文本"""
+        assert self.parser._is_bullet_point(_paragraph(text, bullet=bullet)) is expected
+    
+    def test_extract_tables_skips_unknown_shape(self):
+        """测试跳过python-pptx无法识别类型的形状"""
+        unknown_shape = MagicMock()
+        type(unknown_shape).shape_type = PropertyMock(side_effect=NotImplementedError)
         
-        # 测试文本开头的项目符号
-        mock_para.paragraph_format.bullet = None
-        mock_para.text = "• 项目符号"
-        result = self.parser._is_bullet_point(mock_para)
-        self.assertTrue(result)
+        mock_slide = MagicMock()
+        mock_slide.shapes = [unknown_shape]
         
-        # 测试普通文本
-        mock_para.text = "普通文本"
-        result = self.parser._is_bullet_point(mock_para)
-        self.assertFalse(result)
-
+        assert self.parser._extract_tables(mock_slide) == []
+        assert self.parser._extract_images(mock_slide) == []
 
-if __name__ == "__main__":
-    unittest.main()